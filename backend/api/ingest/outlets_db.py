@@ -0,0 +1,137 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SOURCE_PATH = BASE_DIR / "data" / "outlets.jsonl"
+DB_PATH = BASE_DIR / "data" / "outlets.db"
+
+COLUMNS = ("city", "outlet", "open_time", "close_time", "latitude", "longitude")
+REQUIRED = ("city", "outlet", "open_time", "close_time")
+
+SCHEMA = """
+CREATE TABLE outlets (
+city TEXT NOT NULL,
+outlet TEXT NOT NULL,
+open_time TEXT NOT NULL,
+close_time TEXT NOT NULL,
+latitude REAL,
+longitude REAL )
+"""
+
+INDEXES = [
+    "CREATE INDEX idx_outlets_city ON outlets(city)",
+    "CREATE INDEX idx_outlets_outlet ON outlets(outlet)",
+]
+
+
+def read_rows(path: Path) -> list[dict]:
+    """Read outlet rows from a .csv (with a header row) or .jsonl file."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    return rows
+
+
+def _coord(value):
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def to_records(rows: list[dict]) -> list[tuple]:
+    records = []
+    for n, r in enumerate(rows, 1):
+        not_text = [c for c in REQUIRED if r.get(c) is not None and not isinstance(r[c], str)]
+        if not_text:
+            raise ValueError(f"Row {n} has non-text {', '.join(not_text)}: {r}")
+        missing = [c for c in REQUIRED if not (r.get(c) or "").strip()]
+        if missing:
+            raise ValueError(f"Row {n} is missing {', '.join(missing)}: {r}")
+        records.append((
+            r["city"].strip(),
+            r["outlet"].strip(),
+            r["open_time"].strip(),
+            r["close_time"].strip(),
+            _coord(r.get("latitude")),
+            _coord(r.get("longitude")),
+        ))
+    return records
+
+
+def _fsync_dir(path: Path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # Not supported on this platform (e.g. Windows)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def build_db(rows: list[dict], db_path: Path = DB_PATH) -> int:
+    """
+    Build a fresh outlets database next to db_path and atomically rename it
+    into place. Readers holding the old file keep a consistent view of it
+    until they reopen.
+    """
+    db_path = Path(db_path)
+    records = to_records(rows)
+    if not records:
+        raise RuntimeError("No outlet rows to load.")
+
+    tmp_path = db_path.with_name(f".{db_path.name}.{os.getpid()}.tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            # Nothing else can see the temp file, so skip the journal and fsync once at the end
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            with conn:
+                conn.execute(SCHEMA)
+                conn.executemany(
+                    f"INSERT INTO outlets ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    records,
+                )
+                for stmt in INDEXES:
+                    conn.execute(stmt)
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+
+        with open(tmp_path, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, db_path)
+        _fsync_dir(db_path.parent)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build outlets.db from a CSV/JSONL source.")
+    parser.add_argument("source", nargs="?", default=SOURCE_PATH, type=Path)
+    parser.add_argument("--db", default=DB_PATH, type=Path)
+    args = parser.parse_args()
+
+    if not args.source.exists():
+        raise FileNotFoundError(f"Outlets source not found: {args.source}")
+
+    count = build_db(read_rows(args.source), args.db)
+    print(f"Saved {count} outlets to {args.db}")
+
+if __name__ == "__main__":
+    main()
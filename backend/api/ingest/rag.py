@@ -1,21 +1,31 @@
 import json
 import os
+import re
+import shutil
+import time
 from pathlib import Path
+from typing import Optional
 from langchain_openai import ChatOpenAI
-from langchain_openai import OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.documents import Document
 from dotenv import load_dotenv
 
+from backend.api.services.embeddings import get_embeddings, write_embedding_meta
+from backend.api.services.product_attributes import extract_attributes, write_attribute_table
+from backend.api.services.shared_index import write_shared_docstore
+from backend.api.services.vector_index import publish_version, read_current_version
+
 load_dotenv() 
 
 BASE_DIR = Path(__file__).resolve().parents[1]   
 JSONL_PATH = BASE_DIR / "data" / "drinkware.jsonl"
 INDEX_DIR = BASE_DIR / "data"
+INDEX_ROOT = INDEX_DIR / "index"   # one sub-directory per published version
+KEEP_VERSIONS = 3
 
-os.makedirs(INDEX_DIR, exist_ok=True)
+os.makedirs(INDEX_ROOT, exist_ok=True)
 
 def row_to_text(r: dict) -> str:
     title = r.get("title") or ""
@@ -38,15 +48,52 @@ def row_to_text(r: dict) -> str:
     ]
     return "\n".join([p for p in parts if p])
 
-def main():
-    if not JSONL_PATH.exists():
+def save_version(vectordb, root: Path = INDEX_ROOT) -> str:
+    """Write the index into a new version directory, then publish it to running APIs."""
+    version = time.strftime("%Y%m%d-%H%M%S")
+    n = 1
+    while (root / version).exists():
+        n += 1
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{n}"
+
+    tmp = root / f".tmp-{version}-{os.getpid()}"
+    vectordb.save_local(tmp)
+    write_shared_docstore(vectordb, tmp)
+    write_embedding_meta(tmp, vectordb.embedding_function)
+    write_attribute_table(vectordb, tmp)
+    os.rename(tmp, root / version)
+    publish_version(root, version)
+    prune_versions(root)
+    return version
+
+_VERSION_RE = re.compile(r"^(\d{8}-\d{6})(?:-(\d+))?$")
+
+def _version_key(name: str) -> Optional[tuple]:
+    """Build order of a version name ("-10" collision suffixes sort after "-2"), or None if it is not one."""
+    m = _VERSION_RE.match(name)
+    if m is None:
+        return None
+    return (m.group(1), int(m.group(2) or 0))
+
+def prune_versions(root: Path = INDEX_ROOT, keep: int = KEEP_VERSIONS):
+    """Delete all but the newest `keep` versions; directories that are not build versions are left alone."""
+    current = read_current_version(root)
+    versions = sorted((p for p in root.iterdir() if p.is_dir() and _version_key(p.name) is not None),
+                      key=lambda p: _version_key(p.name))
+    for old in versions[:-keep]:
+        if old.name != current:
+            shutil.rmtree(old, ignore_errors=True)
+
+def load_rows(path: Path = JSONL_PATH) -> list[dict]:
+    if not path.exists():
         raise FileNotFoundError("Run your scraper first to produce drinkware.jsonl")
 
-    rows = [json.loads(line) for line in JSONL_PATH.read_text(encoding="utf-8").splitlines() if line.strip()]
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
     if not rows:
         raise RuntimeError("drinkware.jsonl is empty.")
+    return rows
 
-    
+def build_chunks(rows: list[dict]) -> list[Document]:
     docs = []
     for r in rows:
         text = row_to_text(r)
@@ -55,19 +102,24 @@ def main():
             "price_rm": r.get("price_rm"),
             "url": r.get("url"),
             "image": r.get("image"),
+            # Typed columns (capacity_ml, price range, feature flags) for filtered search
+            **extract_attributes(r),
         }
         docs.append(Document(page_content=text, metadata=meta))
 
     splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150)
-    chunks = splitter.split_documents(docs)
+    return splitter.split_documents(docs)
+
+def main():
+    chunks = build_chunks(load_rows())
 
-    # embeddings
-    embeddings = OpenAIEmbeddings()                      
+    # embeddings (EMBEDDING_BACKEND=openai|hashing)
+    embeddings = get_embeddings()
 
     #Vector Store
     vectordb = FAISS.from_documents(chunks, embedding=embeddings)
-    vectordb.save_local(INDEX_DIR)
-    print(f"Saved FAISS index to {INDEX_DIR} (chunks: {len(chunks)})")
+    version = save_version(vectordb)
+    print(f"Saved FAISS index version {version} to {INDEX_ROOT} (chunks: {len(chunks)})")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SNAPSHOT_DIR = BASE_DIR / "data" / "snapshots"
+MANIFEST_FILE = "manifest.jsonl"
+
+
+class SnapshotStore:
+    """
+    Raw HTML of every fetched page, gzip-compressed and content-addressed by
+    SHA-256 under objects/<2 hex>/<digest>.html.gz. Identical pages are stored
+    once; manifest.jsonl records every fetch (url, digest, time, kind and the
+    crawl it belonged to), so the pages of the last crawl can be re-parsed
+    without the network.
+    """
+
+    def __init__(self, root: Path = SNAPSHOT_DIR):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.manifest = self.root / MANIFEST_FILE
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / f"{digest}.html.gz"
+
+    def put(self, url: str, html: str, kind: str = "page", crawl_id: Optional[str] = None) -> str:
+        """Store a fetched page and record it in the manifest. Returns its digest."""
+        raw = html.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{digest}.{os.getpid()}.tmp")
+            tmp.write_bytes(gzip.compress(raw, mtime=0))
+            os.replace(tmp, path)
+
+        entry = {"url": url, "sha256": digest, "fetched_at": time.time(), "kind": kind, "bytes": len(raw)}
+        if crawl_id is not None:
+            entry["crawl"] = crawl_id
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.manifest, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return digest
+
+    def get(self, digest: str) -> str:
+        return gzip.decompress(self._object_path(digest).read_bytes()).decode("utf-8")
+
+    def entries(self) -> Iterator[dict]:
+        if not self.manifest.exists():
+            return
+        with open(self.manifest, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def latest_crawl(self) -> Optional[str]:
+        """Id of the most recently recorded crawl, or None for a manifest without crawl ids."""
+        last = None
+        for entry in self.entries():
+            last = entry.get("crawl") or last
+        return last
+
+    def latest(self, kind: Optional[str] = None, crawl_id: Optional[str] = None) -> Dict[str, dict]:
+        """Newest manifest entry per URL, optionally only of one kind and/or one crawl."""
+        newest: Dict[str, dict] = {}
+        for entry in self.entries():
+            if kind is not None and entry.get("kind") != kind:
+                continue
+            if crawl_id is not None and entry.get("crawl") != crawl_id:
+                continue
+            seen = newest.get(entry["url"])
+            if seen is None or entry["fetched_at"] >= seen["fetched_at"]:
+                newest[entry["url"]] = entry
+        return newest
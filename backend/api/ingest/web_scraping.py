@@ -3,11 +3,16 @@ import csv
 import time
 import json
 import  os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 from urllib.parse import urljoin, urlparse
 import requests
 from bs4 import BeautifulSoup
 from pathlib import Path
 
+from backend.api.ingest.snapshots import SNAPSHOT_DIR, SnapshotStore
+
 
 BASE_DIR = Path(__file__).resolve().parents[1]    
 DATA_DIR = BASE_DIR / "data"
@@ -22,13 +27,17 @@ HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; ZUS-Scraper/1.0; +https://exa
 
 
 
-def get_html(url):
+def get_html(url, store: Optional[SnapshotStore] = None, kind: str = "page", crawl_id: Optional[str] = None):
     r = requests.get(url, headers=HEADERS, timeout=15)
     r.raise_for_status()
+    if store is not None:
+        store.put(url, r.text, kind=kind, crawl_id=crawl_id)
     return r.text
 
-def collect_product_links(collection_url):
-    html = get_html(collection_url)
+def collect_product_links(collection_url, store: Optional[SnapshotStore] = None, crawl_id: Optional[str] = None):
+    return parse_product_links(get_html(collection_url, store, kind="collection", crawl_id=crawl_id))
+
+def parse_product_links(html):
     soup = BeautifulSoup(html, "html.parser")
     links = set()
 
@@ -97,8 +106,11 @@ def extract_main_image(soup):
         return src
     return None
 
-def scrape_product(url):
-    html = get_html(url)
+def fetch_product(url, store: Optional[SnapshotStore] = None, crawl_id: Optional[str] = None):
+    return get_html(url, store, kind="product", crawl_id=crawl_id)
+
+def parse_product(html, url):
+    """Extract the product fields from a product page; no network access."""
     soup = BeautifulSoup(html, "html.parser")
     title_el = soup.select_one("h1") or soup.select_one("h1.product__title")
     title = title_el.get_text(strip=True) if title_el else None
@@ -129,23 +141,91 @@ def scrape_product(url):
         "url": url,
     }
 
+def scrape_product(url, store: Optional[SnapshotStore] = None, crawl_id: Optional[str] = None):
+    return parse_product(fetch_product(url, store, crawl_id), url)
+
+def _parse_snapshot(job):
+    root, url, digest = job
+    try:
+        return parse_product(SnapshotStore(root).get(digest), url)
+    except Exception as e:
+        print(f"Error on {url} (snapshot {digest}): {e}")
+        return None
+
+def latest_crawl_products(store: SnapshotStore):
+    """
+    Newest snapshot of each product in the last crawl. Manifests written
+    before crawl ids existed fall back to the links on the newest collection
+    page, and then to every product ever fetched.
+    """
+    crawl_id = store.latest_crawl()
+    if crawl_id is not None:
+        return store.latest(kind="product", crawl_id=crawl_id)
+    products = store.latest(kind="product")
+    listings = store.latest(kind="collection")
+    if not listings:
+        return products
+    listing = max(listings.values(), key=lambda e: e["fetched_at"])
+    links = parse_product_links(store.get(listing["sha256"]))
+    return {url: products[url] for url in links if url in products}
+
+def reextract_from_snapshots(store: SnapshotStore, workers: Optional[int] = None):
+    """
+    Rebuild the product rows from the last crawl's snapshots, parsing pages
+    in parallel across cores. Rows come back in URL order, like a crawl;
+    pages that fail to load or parse are reported and left out.
+    """
+    latest = latest_crawl_products(store)
+    jobs = [(str(store.root), url, latest[url]["sha256"]) for url in sorted(latest)]
+    if not jobs:
+        return []
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        rows = [_parse_snapshot(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(_parse_snapshot, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    return [r for r in rows if r is not None]
+
 def save_jsonl(rows, path=SAVE_PATH):
     with open(path, "w", encoding="utf-8") as f:
         for r in rows:
             f.write(json.dumps(r, ensure_ascii=False) + "\n")
 
-if __name__ == "__main__":
+def crawl(store: SnapshotStore):
+    crawl_id = time.strftime("%Y%m%d-%H%M%S")
     collection_url = urljoin(BASE, COLLECTION)
-    product_links = collect_product_links(collection_url)
+    product_links = collect_product_links(collection_url, store, crawl_id)
     print(f"Found {len(product_links)} product URLs")
     rows = []
     for i, url in enumerate(product_links, 1):
         try:
-            data = scrape_product(url)
+            data = scrape_product(url, store, crawl_id)
             rows.append(data)
             print(f"[{i}/{len(product_links)}] {data['title']}")
         except Exception as e:
             print(f"Error on {url}: {e}")
         time.sleep(0.7) 
-    save_jsonl(rows)
-    print("Saved to {SAVE_PATH}")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape ZUS drinkware into drinkware.jsonl")
+    parser.add_argument("--from-snapshots", action="store_true",
+                        help="re-extract from stored HTML snapshots instead of crawling")
+    parser.add_argument("--snapshots", type=Path, default=SNAPSHOT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: all cores)")
+    parser.add_argument("--out", type=Path, default=SAVE_PATH)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.snapshots)
+    if args.from_snapshots:
+        start = time.perf_counter()
+        rows = reextract_from_snapshots(store, args.workers)
+        print(f"Re-extracted {len(rows)} products from snapshots in {time.perf_counter() - start:.2f}s")
+    else:
+        rows = crawl(store)
+    save_jsonl(rows, args.out)
+    print(f"Saved to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,24 @@
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.api.routers import chat, calculator, outlets, products
+from backend.api.routers import admin, chat, calculator, outlets, products
+from backend.api.services.admission import AdmissionConfig, AdmissionControlMiddleware
 
-def create_app() -> FastAPI:
-    app = FastAPI(title="Mindhive Assessment API", version="1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    products.start_index_watcher()
+    yield
+    products.stop_index_watcher()
+
+def create_app(admission: Optional[AdmissionConfig] = None) -> FastAPI:
+    app = FastAPI(title="Mindhive Assessment API", version="1.0", lifespan=lifespan)
 
     origins = ["*"]
 
+    # Added before CORS so CORS stays outermost and 429/503 responses still get CORS headers
+    app.add_middleware(AdmissionControlMiddleware, config=admission or AdmissionConfig.from_env())
+
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -19,6 +31,7 @@ def create_app() -> FastAPI:
     app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
     app.include_router(products.router, prefix="/api/v1", tags=["products"])
     app.include_router(outlets.router, prefix="/api/v1", tags=["outlets"])
+    app.include_router(admin.router, prefix="/api/v1", tags=["admin"])
 
     return app
 
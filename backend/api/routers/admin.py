@@ -0,0 +1,90 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+from backend.api.services import profiling
+from backend.api.services.llm import breaker_states, token_usage
+
+router = APIRouter()
+
+# Guards the LLM admin routes; the profiling routes use PROFILING_TOKEN instead
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def _check_token(expected: Optional[str], given: Optional[str]):
+    # Routes behind an unset token do not exist
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest((given or "").encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid token.")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """LLM admin routes need ADMIN_TOKEN in X-Admin-Token."""
+    _check_token(ADMIN_TOKEN, x_admin_token)
+
+def require_profiling(x_profiling_token: Optional[str] = Header(None)):
+    """Profiling routes need PROFILING_TOKEN in X-Profiling-Token."""
+    _check_token(profiling.PROFILING_TOKEN, x_profiling_token)
+
+class BreakerState(BaseModel):
+    state: str                  # closed | open | half_open
+    consecutive_failures: int
+    retry_in_seconds: float     # time left before an open breaker lets a probe through
+    total_calls: int
+    total_failures: int
+    total_rejected: int
+    last_error: Optional[str] = None
+
+@router.get("/admin/llm", response_model=Dict[str, BreakerState], dependencies=[Depends(require_admin)])
+def llm_breakers():
+    """Circuit breaker state for every LLM endpoint used so far, keyed by base_url#model."""
+    return breaker_states()
+
+class TokenUsage(BaseModel):
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_prompt_tokens: int   # prompt tokens the provider served from its prefix cache
+    estimated_calls: int        # calls without provider usage data, counted locally
+
+@router.get("/admin/llm/usage", response_model=Dict[str, TokenUsage], dependencies=[Depends(require_admin)])
+def llm_token_usage():
+    """Prompt and completion tokens per LLM route (outlets_sql, products_summary, chitchat) since startup."""
+    return token_usage()
+
+class ProfileSummary(BaseModel):
+    id: str
+    name: str
+    started_at: float
+    duration_ms: Optional[float] = None
+    samples: int
+    interval_ms: float
+
+class ProfilingState(BaseModel):
+    armed: int   # upcoming requests that will be profiled
+
+@router.post("/admin/profiling/arm", response_model=ProfilingState, dependencies=[Depends(require_profiling)])
+def arm_profiling(requests: int = Query(1, ge=0, le=100, description="Profile the next N /chat requests")):
+    profiling.arm(requests)
+    return ProfilingState(armed=profiling.armed())
+
+@router.get("/admin/profiles", response_model=List[ProfileSummary], dependencies=[Depends(require_profiling)])
+def list_profiles():
+    """Stored request profiles, newest first."""
+    return profiling.list_profiles()
+
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_profiling)])
+def get_profile(
+    profile_id: str,
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed)$",
+                        description="'speedscope' JSON for speedscope.app, or 'collapsed' stacks for flamegraph.pl"),
+):
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    return profile.speedscope()
@@ -1,7 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Response
 from pydantic import BaseModel
 from langchain_core.messages import HumanMessage
 from backend.app.graph_app import build_app  
+from backend.api.services import profiling
 
 router = APIRouter()
 graph = build_app()  
@@ -18,11 +19,14 @@ class ChatOut(BaseModel):
     slots: dict | None = None
 
 @router.post("/chat", response_model=ChatOut)
-def chat(body: ChatIn):
-    result = graph.invoke(
-        {"messages": [HumanMessage(content=body.message)]},
-        config={"configurable": {"thread_id": body.session_id}},
-    )
+def chat(body: ChatIn, response: Response, x_profile: str | None = Header(None)):
+    with profiling.maybe_profile("chat", header=x_profile) as profile:
+        result = graph.invoke(
+            {"messages": [HumanMessage(content=body.message)]},
+            config={"configurable": {"thread_id": body.session_id}},
+        )
+    if profile is not None:
+        response.headers[profiling.PROFILE_ID_HEADER] = profile.id
     reply = result["messages"][-1].content
     return ChatOut(
         reply=reply,
@@ -1,19 +1,32 @@
 import re
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 import sqlite3
-from langchain_openai import ChatOpenAI
+import threading
 from pathlib import Path
 import os
 import re
 
+from backend.api.services.geo import GeoIndex
+from backend.api.services.llm import LLMUnavailable, chat_model
+from backend.api.services.opening_hours import OpenHoursIndex, parse_time
+from backend.api.services.pagination import NDJSON_MEDIA_TYPE, decode_cursor, encode_cursor, ndjson_lines
+from backend.api.services.prompts import outlets_sql_messages
+
 router = APIRouter()
 
 THIS_FILE = Path(__file__).resolve()
 API_DIR = THIS_FILE.parents[1]
 DB_PATH = API_DIR / "data" / "outlets.db"
 
-LLM = ChatOpenAI(model="gpt-4o-mini", api_key=os.getenv("OPENAI_API_KEY"))
+LLM = chat_model("gpt-4o-mini", route="outlets_sql")
+
+# Outlets are all in Malaysia (UTC+8, no DST)
+OUTLETS_TZ = timezone(timedelta(hours=int(os.getenv("OUTLETS_UTC_OFFSET", "8"))))
 
 class OutletResult(BaseModel):
     outlet: str
@@ -21,59 +34,249 @@ class OutletResult(BaseModel):
     open_time : str
     close_time : str
 
-@router.get("/outlets", response_model=list[OutletResult])
-def outlets(query: str = Query(..., description="Outlets of ZUS in KL and Selangor")):
-    if not query.strip():
-        raise HTTPException(status_code=400, detail="Query cannot be empty")
+class NearestOutlet(OutletResult):
+    latitude: float
+    longitude: float
+    distance_km: float
+
+_local = threading.local()
+_index_signature = None
+_hours_index = None
+_geo_index = None
+
+def _db_signature() -> tuple:
+    # ingest/outlets_db.py swaps in a new file with os.replace, which changes the inode
+    st = os.stat(DB_PATH)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _get_conn() -> sqlite3.Connection:
+    """Per-thread read-only connection, reopened when outlets.db has been replaced."""
+    signature = _db_signature()
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.signature != signature or _local.path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(f"{Path(DB_PATH).resolve().as_uri()}?mode=ro", uri=True)
+        _local.conn, _local.signature, _local.path = conn, signature, DB_PATH
+    return conn
+
+def _refresh_indexes():
+    """Drop the in-memory indexes if outlets.db changed since they were built."""
+    global _index_signature, _hours_index, _geo_index
+    signature = (DB_PATH, _db_signature())
+    if signature != _index_signature:
+        _hours_index = _geo_index = None
+        _index_signature = signature
+
+def _read_outlet_rows() -> list[dict]:
+    """All outlet rows; latitude/longitude are optional columns and default to None."""
+    cur = _get_conn().cursor()
+    cur.row_factory = sqlite3.Row
+    columns = {r["name"] for r in cur.execute("PRAGMA table_info(outlets)")}
+    coords = ", latitude, longitude" if {"latitude", "longitude"} <= columns else ", NULL AS latitude, NULL AS longitude"
+    return [dict(r) for r in cur.execute(
+        f"SELECT city, outlet, open_time, close_time{coords} FROM outlets"
+    )]
+
+def _load_hours_index() -> OpenHoursIndex:
+    global _hours_index
+    _refresh_indexes()
+    if _hours_index is None:
+        _hours_index = OpenHoursIndex(_read_outlet_rows())
+    return _hours_index
+
+def _load_geo_index() -> GeoIndex:
+    global _geo_index
+    _refresh_indexes()
+    if _geo_index is None:
+        located = [r for r in _read_outlet_rows() if r["latitude"] is not None and r["longitude"] is not None]
+        _geo_index = GeoIndex([(r["latitude"], r["longitude"]) for r in located], located)
+    return _geo_index
+
+@router.get("/outlets/nearest", response_model=list[NearestOutlet])
+def outlets_nearest(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the user"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude of the user"),
+    k: int = Query(5, ge=1, le=50),
+):
+    try:
+        index = _load_geo_index()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Outlets query error: {e}")
+
+    return [
+        {
+            "outlet": r["outlet"], "city": r["city"], "open_time": r["open_time"], "close_time": r["close_time"],
+            "latitude": r["latitude"], "longitude": r["longitude"], "distance_km": round(dist, 3),
+        }
+        for dist, r in index.nearest(lat, lng, k)
+    ]
+
+@router.get("/outlets/open", response_model=list[OutletResult])
+def outlets_open(
+    at: Optional[str] = Query(None, description="Time of day, e.g. '22:00' or '10pm'. Defaults to now."),
+    city: Optional[str] = Query(None, description="Restrict to one city, e.g. 'Petaling Jaya'"),
+):
+    if at is None or not at.strip():
+        now = datetime.now(OUTLETS_TZ)
+        minute = now.hour * 60 + now.minute
+    else:
+        try:
+            minute = parse_time(at)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     try:
-        prompt = f"""
-        Given this schema:
-        CREATE TABLE outlets(city TEXT, outlet TEXT, open_time TEXT, close_time TEXT);
+        index = _load_hours_index()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Outlets query error: {e}")
 
-        Write ONE SQL SELECT that returns EXACTLY these columns:
-        city, outlet, open_time, close_time
-        FROM the outlets table only.
-        You may add a WHERE clause on city and/or outlet if present in the user query.
-        Do NOT use JOIN, PRAGMA, ATTACH, INSERT, UPDATE, DELETE, DROP, ALTER, UNION or comments.
-        Return ONLY the SQL.
-        User query: {query}
-        """
+    rows = index.open_at(minute, city=city.strip() if city and city.strip() else None)
+    return [
+        {"outlet": r["outlet"], "city": r["city"], "open_time": r["open_time"], "close_time": r["close_time"]}
+        for r in rows
+    ]
 
-        sql_query = LLM.invoke(prompt).content.strip()
+DEFAULT_PAGE_SIZE = 50
+# An ORDER BY clause, up to any LIMIT that follows it
+_ORDER_BY_RE = re.compile(r"\s+order\s+by\s+.*?(?=\s+limit\b|$)", re.IGNORECASE | re.DOTALL)
 
-        sql_query = re.sub(r"^```(?:sql)?\s*|\s*```$", "", sql_query, flags=re.IGNORECASE | re.DOTALL).strip()
-        sql_query = re.sub(r";\s*$", "", sql_query)
+@lru_cache(maxsize=256)
+def _generate_sql(query: str) -> str:
+    """Text2SQL for one user query. Cached so paging through a result set reuses the same SQL."""
+    sql_query = LLM.invoke(outlets_sql_messages(query)).content.strip()
 
-        lower = sql_query.lower()
+    sql_query = re.sub(r"^```(?:sql)?\s*|\s*```$", "", sql_query, flags=re.IGNORECASE | re.DOTALL).strip()
+    sql_query = re.sub(r";\s*$", "", sql_query)
 
-        print("DEBUG SQL =>", repr(sql_query))
+    lower = sql_query.lower()
 
-        if not re.match(
-            r"^select\s+city\s*,\s*outlet\s*,\s*open_time\s*,\s*close_time\s+from\s+outlets\b",
-            lower
-        ):
-            raise ValueError(f"SQL must select city,outlet,open_time,close_time from outlets. Got: {sql_query}")
+    print("DEBUG SQL =>", repr(sql_query))
 
-        forbidden = ["pragma", "attach", "insert", "update", "delete", "drop", "alter", "union", "--", "/*", "*/"]
-        if any(tok in lower for tok in forbidden):
-            raise ValueError(f"Unsafe SQL generated: {sql_query}")
+    if not re.match(
+        r"^select\s+city\s*,\s*outlet\s*,\s*open_time\s*,\s*close_time\s+from\s+outlets\b",
+        lower
+    ):
+        raise ValueError(f"SQL must select city,outlet,open_time,close_time from outlets. Got: {sql_query}")
 
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute(sql_query)
-        rows = cur.fetchall()
+    forbidden = ["pragma", "attach", "insert", "update", "delete", "drop", "alter", "union", "--", "/*", "*/"]
+    if any(tok in lower for tok in forbidden):
+        raise ValueError(f"Unsafe SQL generated: {sql_query}")
+
+    # Results are always in rowid order, so paged and unpaged reads of a query agree
+    return _ORDER_BY_RE.sub("", sql_query)
+
+CITY_ALIASES = {"kl": "Kuala Lumpur", "pj": "Petaling Jaya"}
+
+def _mentioned(names, text: str) -> list:
+    return [n for n in names if n and re.search(rf"\b{re.escape(n.lower())}\b", text)]
+
+def _rule_based_sql(query: str) -> str:
+    """
+    Fallback for when the LLM is unavailable: filter on any city or outlet
+    named in the query, else list every outlet. Names come from the table
+    itself, so user text never reaches the SQL.
+    """
+    q = query.lower()
+    cur = _get_conn().cursor()
+    cities = _mentioned([c for (c,) in cur.execute("SELECT DISTINCT city FROM outlets")], q)
+    cities += [city for alias, city in CITY_ALIASES.items() if re.search(rf"\b{alias}\b", q) and city not in cities]
+    names = _mentioned([o for (o,) in cur.execute("SELECT DISTINCT outlet FROM outlets")], q)
+
+    def in_list(column, values):
+        return f"{column} IN (" + ", ".join("'" + v.replace("'", "''") + "'" for v in values) + ")"
+
+    clauses = [in_list(col, vals) for col, vals in (("city", cities), ("outlet", names)) if vals]
+    sql = "SELECT city, outlet, open_time, close_time FROM outlets"
+    return sql + (" WHERE " + " AND ".join(clauses) if clauses else "")
+
+def _keyset_sql(sql_query: str) -> str:
+    """Wrap validated Text2SQL so rows come back in rowid order after a cursor, one page at a time."""
+    with_rowid = re.sub(r"^\s*select\s+", "SELECT rowid AS _rowid, ", sql_query, count=1, flags=re.IGNORECASE)
+    return (
+        "SELECT city, outlet, open_time, close_time, _rowid "
+        f"FROM ({with_rowid}) WHERE _rowid > ? ORDER BY _rowid LIMIT ?"
+    )
+
+def _row_dict(r) -> dict:
+    return {"outlet": r[1], "city": r[0], "open_time": r[2], "close_time": r[3]}
+
+def _stream_rows(conn: sqlite3.Connection, cur: sqlite3.Cursor, first, page_size: Optional[int]):
+    """Yield NDJSON rows straight off the cursor; paged streams end with a {"next_cursor": ...} line."""
+    try:
+        sent, last = 0, None
+        row = first
+        while row is not None:
+            if page_size is not None and sent == page_size:
+                yield {"next_cursor": encode_cursor({"r": last[4]})}
+                break
+            yield _row_dict(row)
+            sent, last = sent + 1, row
+            row = cur.fetchone()
+    finally:
         conn.close()
 
+@router.get("/outlets", response_model=list[OutletResult])
+def outlets(
+    response: Response,
+    query: str = Query(..., description="Outlets of ZUS in KL and Selangor"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; enables cursor pagination"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="'ndjson' streams one row per line"),
+):
+    if not query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+
+    after = 0
+    if cursor is not None:
+        try:
+            after = int(decode_cursor(cursor)["r"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+    paged = limit is not None or cursor is not None
+    page_size = (limit or DEFAULT_PAGE_SIZE) if paged else None
+
+    try:
+        try:
+            sql_query = _generate_sql(query.strip())
+        except LLMUnavailable:
+            sql_query = _rule_based_sql(query.strip())
+        if paged:
+            sql, params = _keyset_sql(sql_query), (after, page_size + 1)
+        else:
+            sql, params = sql_query, ()
+
+        if format == "ndjson":
+            # Own connection: the stream is consumed from other threadpool threads
+            conn = sqlite3.connect(f"{Path(DB_PATH).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+            try:
+                cur = conn.execute(sql, params)
+                first = cur.fetchone()
+            except Exception:
+                conn.close()
+                raise
+            if first is None:
+                conn.close()
+                raise HTTPException(status_code=404, detail="No outlets found for the query.")
+            return StreamingResponse(
+                ndjson_lines(_stream_rows(conn, cur, first, page_size)),
+                media_type=NDJSON_MEDIA_TYPE,
+            )
+
+        cur = _get_conn().cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+
         if not rows:
             raise HTTPException(status_code=404, detail="No outlets found for the query.")
 
-        return [
-            {"outlet": r[1], "city": r[0], "open_time": r[2], "close_time": r[3]}
-            for r in rows
-        ]
+        if paged and len(rows) > page_size:
+            rows = rows[:page_size]
+            response.headers["X-Next-Cursor"] = encode_cursor({"r": rows[-1][4]})
+
+        return [_row_dict(r) for r in rows]
 
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Outlets query error: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Outlets query error: {e}")
@@ -1,16 +1,33 @@
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Tuple
+from itertools import chain, islice
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from pathlib import Path
 
+import faiss
+import numpy as np
 import os
+import weakref
+
+from backend.api.services.embeddings import check_embedding_meta, encode_queries, get_embeddings
+from backend.api.services.llm import LLMUnavailable, chat_model
+from backend.api.services.product_attributes import AttributeTable, QueryConstraints, load_attribute_table, parse_constraints
+from backend.api.services.pagination import NDJSON_MEDIA_TYPE, decode_cursor, encode_cursor, ndjson_lines
+from backend.api.services.prompts import products_summary_messages
+from backend.api.services.shared_index import open_shared_index
+from backend.api.services.vector_index import VersionedIndex
              
 THIS_FILE = Path(__file__).resolve()
 API_DIR = THIS_FILE.parents[1]
 INDEX_DIR = API_DIR / "data"
+INDEX_ROOT = INDEX_DIR / "index"  # versioned indexes published by ingest/rag.py
+INDEX_POLL_SECONDS = float(os.getenv("PRODUCT_INDEX_POLL_SECONDS", "10"))
+MAX_BATCH_QUERIES = int(os.getenv("PRODUCT_BATCH_MAX_QUERIES", "256"))
+BATCH_SUMMARY_THREADS = int(os.getenv("PRODUCT_BATCH_SUMMARY_THREADS", "8"))
 
 router = APIRouter()
 
@@ -20,6 +37,7 @@ class ProductHit(BaseModel):
     price_rm: Optional[float] = None
     url: Optional[str] = None
     image: Optional[str] = None
+    capacity_ml: Optional[int] = None
     chunk_preview: Optional[str] = None  # short excerpt
 
 class ProductResult(BaseModel):
@@ -28,67 +46,258 @@ class ProductResult(BaseModel):
     k: int
     hits: List[ProductHit]
     summary: Optional[str] = None
+    next_cursor: Optional[str] = None
+    filters: Optional[Dict[str, Any]] = None  # constraints parsed from the query, when applied
+
+class ProductBatchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+    k: int = Field(5, ge=1, le=10)
+    summaries: bool = False  # one LLM call per query, so off by default
+
+class ProductBatchResult(BaseModel):
+    ok: bool
+    k: int
+    results: List[ProductResult]  # same order as the request's queries
+
+class IndexInfo(BaseModel):
+    version: str
+    path: str
+    loaded_at: float
+    load_seconds: float
+    last_reload_error: Optional[str] = None
 
-_vectordb = None
 _embeddings = None
 _llm = None
+# Typed attribute columns per loaded index; entries go away with their index version
+_attribute_tables: "weakref.WeakKeyDictionary[FAISS, Optional[AttributeTable]]" = weakref.WeakKeyDictionary()
+
+def _get_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = get_embeddings()
+    return _embeddings
+
+def _open_index(path: Path) -> FAISS:
+    embeddings = _get_embeddings()
+    check_embedding_meta(path, embeddings)
+    # Read-only mmap, so uvicorn workers share one copy of the vectors and docstore
+    vectordb = open_shared_index(path, embeddings)
+    _attribute_tables[vectordb] = load_attribute_table(path, vectordb)
+    return vectordb
+
+def _attributes_for(vectordb: FAISS) -> Optional[AttributeTable]:
+    if vectordb not in _attribute_tables:
+        _attribute_tables[vectordb] = load_attribute_table(None, vectordb)
+    return _attribute_tables[vectordb]
+
+_index = VersionedIndex(INDEX_ROOT, legacy_dir=INDEX_DIR, loader=_open_index)
+
+def start_index_watcher():
+    _index.start_watcher(INDEX_POLL_SECONDS)
+
+def stop_index_watcher():
+    _index.stop_watcher()
 
 def _load_vectordb():
-    global _vectordb, _embeddings
-    if _vectordb is None:
-        if not (INDEX_DIR / "index.faiss").exists() or not (INDEX_DIR / "index.pkl").exists():
-            raise FileNotFoundError("FAISS index not found in data/. Run ingest script first.")
-        _embeddings = OpenAIEmbeddings()
-        _vectordb = FAISS.load_local(INDEX_DIR, _embeddings, allow_dangerous_deserialization=True)
-    return _vectordb
+    return _index.current().vectordb
 
 def _get_llm():
     global _llm
     if _llm is None and os.getenv("OPENAI_API_KEY"):
-        _llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
+        _llm = chat_model("gpt-4o-mini", temperature=0.2, route="products_summary")
     return _llm
 
+@router.get("/products/index", response_model=IndexInfo)
+def products_index():
+    try:
+        handle = _index.current()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Products index error: {e}")
+    return IndexInfo(
+        version=handle.version,
+        path=str(handle.path),
+        loaded_at=handle.loaded_at,
+        load_seconds=handle.load_seconds,
+        last_reload_error=_index.last_error,
+    )
+
+MAX_RESULT_DEPTH = 1000  # deepest rank a cursor can page to
+
+def _to_hit(doc) -> ProductHit:
+    meta = doc.metadata or {}
+    preview = doc.page_content[:260].replace("\n", " ")
+    return ProductHit(
+        title=meta.get("title"),
+        price_rm=meta.get("price_rm"),
+        url=meta.get("url"),
+        image=meta.get("image"),
+        capacity_ml=meta.get("capacity_ml"),
+        chunk_preview=preview + ("..." if len(doc.page_content) > 260 else "")
+    )
+
+def _ranked(vectordb: FAISS, query: str, depth: int, after: Optional[tuple] = None, ids: Optional[np.ndarray] = None):
+    """
+    Yield (distance, position, doc) in (distance, position) order, skipping
+    everything up to and including the keyset `after`. Documents are only
+    hydrated from the docstore as they are consumed. With `ids`, only those
+    positions are scored.
+    """
+    depth = min(depth, vectordb.index.ntotal if ids is None else len(ids))
+    if depth <= 0:
+        return
+    params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(ids)) if ids is not None else None
+    vector = np.asarray([vectordb.embedding_function.embed_query(query)], dtype=np.float32)
+    distances, positions = vectordb.index.search(vector, depth, params=params)
+    ranked = sorted((float(d), int(p)) for d, p in zip(distances[0], positions[0]) if p >= 0)
+    for key in ranked:
+        if after is not None and key <= after:
+            continue
+        distance, pos = key
+        yield distance, pos, vectordb.docstore.search(vectordb.index_to_docstore_id[pos])
+
+def _search_batch(vectordb: FAISS, queries: List[str], depth: int) -> List[Tuple[List[tuple], Optional[QueryConstraints]]]:
+    """
+    Rank many queries at once: one embedding call for the whole batch, then
+    one FAISS search per distinct filter (a single search when no query has
+    constraints). Returns, per query, its (distance, position) keys in the
+    same order as _ranked and the constraints applied, if any.
+    """
+    vectors = encode_queries(vectordb.embedding_function, queries)
+
+    # Queries with the same constraints share an id selector, so they share a search
+    groups: Dict[Optional[QueryConstraints], List[int]] = {}
+    for i, query in enumerate(queries):
+        constraints = parse_constraints(query)
+        if not constraints.is_empty and _attributes_for(vectordb) is None:
+            constraints = None
+        groups.setdefault(None if constraints is None or constraints.is_empty else constraints, []).append(i)
+
+    results: List[Tuple[List[tuple], Optional[QueryConstraints]]] = [([], None)] * len(queries)
+    for constraints, rows in groups.items():
+        ids = _attributes_for(vectordb).select(constraints) if constraints is not None else None
+        group_depth = min(depth, vectordb.index.ntotal if ids is None else len(ids))
+        if group_depth <= 0:
+            for i in rows:
+                results[i] = ([], constraints)
+            continue
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(ids)) if ids is not None else None
+        distances, positions = vectordb.index.search(vectors[rows], group_depth, params=params)
+        for i, d_row, p_row in zip(rows, distances, positions):
+            results[i] = (sorted((float(d), int(p)) for d, p in zip(d_row, p_row) if p >= 0), constraints)
+    return results
+
+def _hydrate(vectordb: FAISS, positions) -> Dict[int, Any]:
+    """Each distinct position's document, read from the docstore once."""
+    return {pos: vectordb.docstore.search(vectordb.index_to_docstore_id[pos]) for pos in set(positions)}
+
+def _summarize(llm, query: str, hits: List[ProductHit]) -> Optional[str]:
+    try:
+        return llm.invoke(products_summary_messages(query, hits)).content.strip()
+    except LLMUnavailable:
+        return None  # hits are still useful without the summary
+
+def _page_cursor(last: tuple, served: int) -> str:
+    return encode_cursor({"d": last[0], "p": last[1], "n": served})
+
+def _stream_hits(ranked, k: int, served: int):
+    """NDJSON hits straight from the FAISS result iterator, then {"next_cursor": ...} if more remain."""
+    last = None
+    for sent, (distance, pos, doc) in enumerate(ranked):
+        if sent == k:
+            yield {"next_cursor": _page_cursor(last, served + sent)}
+            return
+        yield _to_hit(doc).model_dump()
+        last = (distance, pos)
+
 @router.get("/products", response_model=ProductResult)
 def products(
     query: str = Query(..., description="Natural language question, e.g. 'leak-proof tumbler under RM100'"),
     k: int = Query(5, ge=1, le=10),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="'ndjson' streams one hit per line"),
 ):
     query = query.strip()
     if not query:
         raise HTTPException(status_code=400, detail="Query cannot be empty.")
+
+    after, served = None, 0
+    if cursor is not None:
+        try:
+            key = decode_cursor(cursor)
+            after, served = (float(key["d"]), int(key["p"])), int(key["n"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+        if served + k > MAX_RESULT_DEPTH:
+            raise HTTPException(status_code=400, detail=f"Cannot page past {MAX_RESULT_DEPTH} results.")
+
     try:
         vectordb = _load_vectordb()
-        docs = vectordb.similarity_search(query,k = k)
-
-        hits: List[ProductHit] = []
-        for d in docs:
-            meta = d.metadata or {}
-            preview = d.page_content[:260].replace("\n", " ")
-            hits.append(ProductHit(
-                title=meta.get("title"),
-                price_rm=meta.get("price_rm"),
-                url=meta.get("url"),
-                image=meta.get("image"),
-                chunk_preview=preview + ("..." if len(d.page_content) > 260 else "")
-            ))
+
+        # Price/capacity/feature constraints narrow the candidates before ranking
+        constraints = parse_constraints(query)
+        table = _attributes_for(vectordb) if not constraints.is_empty else None
+        ids = table.select(constraints) if table is not None else None
+
+        # One extra result tells us whether there is a next page
+        ranked = _ranked(vectordb, query, depth=served + k + 1, after=after, ids=ids)
+
+        if format == "ndjson":
+            first = next(ranked, None)
+            items = chain([first], ranked) if first is not None else iter(())
+            return StreamingResponse(ndjson_lines(_stream_hits(items, k, served)), media_type=NDJSON_MEDIA_TYPE)
+
+        page = list(islice(ranked, k + 1))
+        next_cursor = _page_cursor(page[k - 1][:2], served + k) if len(page) > k else None
+        hits: List[ProductHit] = [_to_hit(doc) for _, _, doc in page[:k]]
 
         llm = _get_llm()
         summary = None
-        if llm and hits:
-            context_lines = []
-            for h in hits:
-                price = f"RM{h.price_rm:,.2f}" if isinstance(h.price_rm, (int, float)) else "N/A"
-                context_lines.append(f"- {h.title} ({price}) — {h.url}")
-            prompt = (
-                "Summarize the most relevant ZUS drinkware for the user's need.\n"
-                f"User query: {query}\n"
-                "Candidates:\n" + "\n".join(context_lines) + "\n\n"
-                "Return 2–4 concise bullets focusing on what to choose and why "
-                "(capacity, insulation, leak-proof, special lids, price hints)."
-            )
-            summary = llm.invoke(prompt).content.strip()
-
-        return ProductResult(ok=True, query=query, k=k, hits=hits, summary=summary)
+        if llm and hits and cursor is None:
+            summary = _summarize(llm, query, hits)
+
+        return ProductResult(
+            ok=True, query=query, k=k, hits=hits, summary=summary, next_cursor=next_cursor,
+            filters=constraints.as_dict() if ids is not None else None,
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Products retrieval error: {e}")
+
+@router.post("/products/batch", response_model=ProductBatchResult)
+def products_batch(body: ProductBatchRequest):
+    """
+    First page of results for many queries in one request. Each result
+    matches what GET /products returns for the same query and k, including
+    next_cursor; summaries are only generated when asked for.
+    """
+    queries = [q.strip() for q in body.queries]
+    empty = [i for i, q in enumerate(queries) if not q]
+    if empty:
+        raise HTTPException(status_code=400, detail=f"Query {empty[0]} cannot be empty.")
+    k = body.k
+
+    try:
+        vectordb = _load_vectordb()
+        # One extra result per query tells us whether there is a next page
+        ranked = _search_batch(vectordb, queries, depth=k + 1)
+        docs = _hydrate(vectordb, (pos for keys, _ in ranked for _, pos in keys[:k]))
+
+        results = []
+        for query, (keys, constraints) in zip(queries, ranked):
+            next_cursor = _page_cursor(keys[k - 1], k) if len(keys) > k else None
+            results.append(ProductResult(
+                ok=True, query=query, k=k, hits=[_to_hit(docs[pos]) for _, pos in keys[:k]], next_cursor=next_cursor,
+                filters=constraints.as_dict() if constraints is not None else None,
+            ))
+
+        llm = _get_llm() if body.summaries else None
+        pending = [r for r in results if r.hits]
+        if llm and pending:
+            with ThreadPoolExecutor(max_workers=max(1, min(BATCH_SUMMARY_THREADS, len(pending)))) as pool:
+                for r, summary in zip(pending, pool.map(lambda r: _summarize(llm, r.query, r.hits), pending)):
+                    r.summary = summary
+
+        return ProductBatchResult(ok=True, k=k, results=results)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Products retrieval error: {e}")
@@ -0,0 +1,263 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    max_concurrent: int
+    max_queue: int       # requests allowed to wait for a slot; beyond this, reject at once
+    max_wait: float      # seconds a queued request may wait before it is rejected
+
+
+# Path prefix -> limit group. Longest prefix wins, so the CPU-only outlet lookups
+# do not share capacity with the LLM-backed /outlets Text2SQL route.
+DEFAULT_ROUTE_GROUPS = {
+    "/api/v1/chat": "chat",
+    "/api/v1/outlets": "outlets",
+    "/api/v1/outlets/open": "lookup",
+    "/api/v1/outlets/nearest": "lookup",
+    "/api/v1/products": "products",
+    "/api/v1/products/index": "lookup",
+    "/api/v1/calculator": "calculator",
+}
+
+# The LLM-backed groups together stay well under the 40-thread default
+# threadpool, so cheap routes always find a free worker thread.
+DEFAULT_LIMITS = {
+    "chat": RouteLimit(6, 12, 2.0),
+    "outlets": RouteLimit(6, 12, 2.0),
+    "products": RouteLimit(6, 12, 2.0),
+    "calculator": RouteLimit(16, 32, 0.5),
+    "lookup": RouteLimit(16, 32, 0.5),
+}
+
+
+def _parse_limit(value: str) -> RouteLimit:
+    concurrent, queue, wait = value.split(",")
+    return RouteLimit(int(concurrent), int(queue), float(wait))
+
+
+@dataclass
+class AdmissionConfig:
+    route_groups: Dict[str, str] = field(default_factory=lambda: dict(DEFAULT_ROUTE_GROUPS))
+    limits: Dict[str, RouteLimit] = field(default_factory=lambda: dict(DEFAULT_LIMITS))
+    rate_per_second: float = 5.0   # per-session token refill; 0 disables rate limiting
+    burst: int = 20
+    max_sessions: int = 10_000
+
+    @classmethod
+    def from_env(cls) -> "AdmissionConfig":
+        """
+        Override limits with ADMISSION_<GROUP>="concurrency,queue,wait_seconds"
+        (e.g. ADMISSION_CHAT="4,8,1.5"), and the per-session token bucket with
+        RATE_LIMIT_PER_SECOND / RATE_LIMIT_BURST.
+        """
+        config = cls()
+        for group in list(config.limits):
+            value = os.getenv(f"ADMISSION_{group.upper()}")
+            if value:
+                config.limits[group] = _parse_limit(value)
+        config.rate_per_second = float(os.getenv("RATE_LIMIT_PER_SECOND", config.rate_per_second))
+        config.burst = int(os.getenv("RATE_LIMIT_BURST", config.burst))
+        return config
+
+    def group_for(self, path: str) -> Optional[str]:
+        best = None
+        for prefix, group in self.route_groups.items():
+            if (path == prefix or path.startswith(prefix + "/")) and (best is None or len(prefix) > len(best[0])):
+                best = (prefix, group)
+        return best[1] if best else None
+
+
+class _Gate:
+    """
+    Concurrency limit with a bounded FIFO wait queue. Assumes a single event
+    loop per process, which is how uvicorn runs each worker.
+    """
+
+    def __init__(self, limit: RouteLimit):
+        self.limit = limit
+        self.active = 0
+        self.waiters: deque = deque()
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        if self.active < self.limit.max_concurrent and not self.waiters:
+            self.active += 1
+            return True
+        if len(self.waiters) >= self.limit.max_queue:
+            self.rejected += 1
+            return False
+
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self.waiters.append(fut)
+        timer = loop.call_later(self.limit.max_wait, lambda: fut.done() or fut.set_result(False))
+        try:
+            granted = await fut
+        except asyncio.CancelledError:
+            # Client went away; hand back a slot we may have been given meanwhile
+            if fut.done() and not fut.cancelled() and fut.result():
+                self.release()
+            raise
+        finally:
+            timer.cancel()
+            if fut in self.waiters:
+                self.waiters.remove(fut)
+        if not granted:
+            self.rejected += 1
+        return granted
+
+    def release(self):
+        # Hand the slot straight to the oldest live waiter, else free it
+        while self.waiters:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                fut.set_result(True)
+                return
+        self.active -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": len(self.waiters),
+            "rejected": self.rejected,
+            "max_concurrent": self.limit.max_concurrent,
+            "max_queue": self.limit.max_queue,
+            "max_wait": self.limit.max_wait,
+        }
+
+
+class _TokenBuckets:
+    def __init__(self, rate: float, burst: int, max_sessions: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_sessions = max_sessions
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, session: str) -> float:
+        """Spend one token. Returns 0 when allowed, else seconds until a token is available."""
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(session, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[session] = (tokens, now)
+        while len(self._buckets) > self.max_sessions:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+MAX_SESSION_BODY = 64 * 1024
+
+
+async def _session_key(scope, receive):
+    """
+    Session for rate limiting: the X-Session-Id header, else `session_id` in a
+    JSON body (as /chat sends it), else the client address. Returns the key
+    and a receive callable that replays any body already read.
+    """
+    headers = dict(scope.get("headers") or [])
+    session = headers.get(b"x-session-id")
+    if session:
+        return "s:" + session.decode("latin-1"), receive
+
+    content_type = headers.get(b"content-type", b"")
+    length = headers.get(b"content-length")
+    if (
+        scope.get("method") == "POST"
+        and content_type.startswith(b"application/json")
+        and length is not None
+        and int(length) <= MAX_SESSION_BODY
+    ):
+        chunks, more = [], True
+        while more:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        try:
+            session_id = json.loads(body).get("session_id")
+        except (ValueError, AttributeError):
+            session_id = None
+        if isinstance(session_id, str) and session_id:
+            return "s:" + session_id, replay
+        receive = replay
+
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown"), receive
+
+
+class AdmissionControlMiddleware:
+    """Per-route concurrency limits, bounded wait queues and per-session rate limits."""
+
+    def __init__(self, app, config: Optional[AdmissionConfig] = None):
+        self.app = app
+        self.config = config or AdmissionConfig.from_env()
+        self.gates = {group: _Gate(limit) for group, limit in self.config.limits.items()}
+        self.buckets = (
+            _TokenBuckets(self.config.rate_per_second, self.config.burst, self.config.max_sessions)
+            if self.config.rate_per_second > 0 else None
+        )
+        self.rate_limited = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "groups": {group: gate.snapshot() for group, gate in self.gates.items()},
+            "rate_limited": self.rate_limited,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        group = self.config.group_for(scope["path"])
+        gate = self.gates.get(group)
+        if gate is None:
+            return await self.app(scope, receive, send)
+
+        if self.buckets is not None:
+            session, receive = await _session_key(scope, receive)
+            wait = self.buckets.take(session)
+            if wait > 0:
+                self.rate_limited += 1
+                response = JSONResponse(
+                    {"detail": "Too many requests, please try again shortly."},
+                    status_code=429,
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+                return await response(scope, receive, send)
+
+        if not await gate.acquire():
+            response = JSONResponse(
+                {"detail": "Service is busy, please try again shortly."},
+                status_code=503,
+                headers={"Retry-After": str(max(1, math.ceil(gate.limit.max_wait)))},
+            )
+            return await response(scope, receive, send)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
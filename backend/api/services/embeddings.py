@@ -0,0 +1,141 @@
+import json
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+META_FILE = "embedding.json"
+
+# Indexes saved before the backend was recorded were all built with OpenAIEmbeddings()
+LEGACY_SPEC = {"backend": "openai", "model": "text-embedding-ada-002"}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class EmbeddingMismatchError(RuntimeError):
+    pass
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    CPU-only embeddings from hashed word unigrams and character n-grams
+    (the "hashing trick"), with sublinear term frequency and L2
+    normalisation. Deterministic across processes, so ingest and the API
+    produce the same vectors without sharing any fitted state.
+    """
+
+    backend = "hashing"
+
+    def __init__(self, dim: int = 1024, ngram_min: int = 3, ngram_max: int = 5):
+        if dim <= 0 or not 1 <= ngram_min <= ngram_max:
+            raise ValueError("Invalid hashing embedding parameters.")
+        self.dim = dim
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+
+    @property
+    def spec(self) -> dict:
+        return {"backend": self.backend, "dim": self.dim, "ngram_min": self.ngram_min, "ngram_max": self.ngram_max}
+
+    def _features(self, text: str) -> List[str]:
+        feats = []
+        for word in _TOKEN_RE.findall(text.lower()):
+            feats.append(word)
+            padded = f"<{word}>"
+            for n in range(self.ngram_min, self.ngram_max + 1):
+                feats.extend(f"#{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return feats
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode a batch of texts into a (len(texts), dim) float32 matrix."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        rows, cols, signs = [], [], []
+        for r, text in enumerate(texts):
+            for feat in self._features(text):
+                h = zlib.crc32(feat.encode("utf-8"))
+                rows.append(r)
+                cols.append(h % self.dim)
+                # Use a bit the column index does not depend on for the sign
+                signs.append(1.0 if (h >> 31) & 1 else -1.0)
+        if rows:
+            np.add.at(out, (np.asarray(rows), np.asarray(cols)), np.asarray(signs, dtype=np.float32))
+            np.copysign(np.log1p(np.abs(out)), out, out=out)
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+def _openai() -> Embeddings:
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings()
+
+
+def _hashing() -> Embeddings:
+    return HashingEmbeddings(dim=int(os.getenv("HASHING_EMBEDDING_DIM", "1024")))
+
+
+BACKENDS: Dict[str, Callable[[], Embeddings]] = {
+    "openai": _openai,
+    "hashing": _hashing,
+}
+
+
+def get_embeddings(name: Optional[str] = None) -> Embeddings:
+    """Embedding backend named by `name` or the EMBEDDING_BACKEND env var (default: openai)."""
+    name = (name or os.getenv("EMBEDDING_BACKEND", "openai")).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {name!r}. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def embedding_spec(embeddings: Embeddings) -> dict:
+    """Everything that must match between the index builder and the query path."""
+    spec = getattr(embeddings, "spec", None)
+    if spec is not None:
+        return dict(spec)
+    model = getattr(embeddings, "model", None)
+    if model is not None and type(embeddings).__name__ == "OpenAIEmbeddings":
+        spec = {"backend": "openai", "model": model}
+        if getattr(embeddings, "dimensions", None):
+            spec["dimensions"] = embeddings.dimensions
+        return spec
+    return {"backend": type(embeddings).__name__}
+
+
+def encode_queries(embeddings: Embeddings, texts: List[str]) -> np.ndarray:
+    """Embed a batch of queries in one call, as a float32 matrix for FAISS."""
+    if hasattr(embeddings, "encode"):
+        return embeddings.encode(list(texts))
+    return np.asarray(embeddings.embed_documents(list(texts)), dtype=np.float32)
+
+
+def write_embedding_meta(path: Path, embeddings: Embeddings):
+    (Path(path) / META_FILE).write_text(json.dumps(embedding_spec(embeddings), indent=2), encoding="utf-8")
+
+
+def read_embedding_meta(path: Path) -> dict:
+    meta = Path(path) / META_FILE
+    if not meta.exists():
+        return dict(LEGACY_SPEC)
+    return json.loads(meta.read_text(encoding="utf-8"))
+
+
+def check_embedding_meta(path: Path, embeddings: Embeddings):
+    """Refuse to serve an index with a different embedding backend than the one configured."""
+    built_with = read_embedding_meta(path)
+    configured = embedding_spec(embeddings)
+    if built_with != configured:
+        raise EmbeddingMismatchError(
+            f"Index in {path} was built with {built_with} but queries would use {configured}. "
+            "Rebuild the index or set EMBEDDING_BACKEND to match."
+        )
@@ -0,0 +1,113 @@
+import heapq
+import math
+from typing import Any, List, Sequence, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+_LEAF_SIZE = 8
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _to_xyz(lat: float, lng: float) -> Tuple[float, float, float]:
+    p, l = math.radians(lat), math.radians(lng)
+    cp = math.cos(p)
+    return (cp * math.cos(l), cp * math.sin(l), math.sin(p))
+
+
+def _chord_to_km(chord_sq: float) -> float:
+    # Chord length c on the unit sphere subtends an angle of 2*asin(c/2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord_sq) / 2))
+
+
+class GeoIndex:
+    """
+    Static k-d tree over (lat, lng) points. Points are projected onto the
+    unit sphere so squared chord distance ranks neighbours exactly as
+    great-circle distance does, without special cases at the antimeridian.
+    """
+
+    def __init__(self, points: Sequence[Tuple[float, float]], payloads: Sequence[Any]):
+        if len(points) != len(payloads):
+            raise ValueError("points and payloads must be the same length.")
+        self._payloads = list(payloads)
+        self._xyz = [_to_xyz(lat, lng) for lat, lng in points]
+        # Flat node arrays: leaves hold a slice of self._order, inner nodes split on one axis
+        self._order = list(range(len(self._xyz)))
+        self._axis: List[int] = []
+        self._split: List[float] = []
+        self._left: List[int] = []
+        self._right: List[int] = []
+        self._lo: List[int] = []
+        self._hi: List[int] = []
+        if self._xyz:
+            self._build(0, len(self._order))
+
+    def __len__(self) -> int:
+        return len(self._xyz)
+
+    def _new_node(self) -> int:
+        for arr in (self._axis, self._split, self._left, self._right, self._lo, self._hi):
+            arr.append(-1)
+        return len(self._axis) - 1
+
+    def _build(self, lo: int, hi: int) -> int:
+        node = self._new_node()
+        self._lo[node], self._hi[node] = lo, hi
+        if hi - lo <= _LEAF_SIZE:
+            return node
+
+        ids = self._order[lo:hi]
+        xyz = self._xyz
+        spreads = [max(xyz[i][a] for i in ids) - min(xyz[i][a] for i in ids) for a in range(3)]
+        axis = spreads.index(max(spreads))
+        ids.sort(key=lambda i: xyz[i][axis])
+        self._order[lo:hi] = ids
+        mid = (lo + hi) // 2
+
+        self._axis[node] = axis
+        self._split[node] = xyz[self._order[mid]][axis]
+        self._left[node] = self._build(lo, mid)
+        self._right[node] = self._build(mid, hi)
+        return node
+
+    def nearest(self, lat: float, lng: float, k: int = 5) -> List[Tuple[float, Any]]:
+        """Return up to k (distance_km, payload) pairs, closest first."""
+        if k <= 0 or not self._xyz:
+            return []
+        qx, qy, qz = q = _to_xyz(lat, lng)
+        xyz, order = self._xyz, self._order
+        axis_of, split_of = self._axis, self._split
+        left_of, right_of = self._left, self._right
+        lo_of, hi_of = self._lo, self._hi
+
+        best: List[Tuple[float, int]] = []  # max-heap of (-chord_sq, point id)
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if len(best) == k and bound >= -best[0][0]:
+                continue
+            axis = axis_of[node]
+            if axis < 0:
+                for i in order[lo_of[node]:hi_of[node]]:
+                    px, py, pz = xyz[i]
+                    d = (px - qx) ** 2 + (py - qy) ** 2 + (pz - qz) ** 2
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, i))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, i))
+                continue
+            diff = q[axis] - split_of[node]
+            near, far = (left_of[node], right_of[node]) if diff < 0 else (right_of[node], left_of[node])
+            # Push the far side first so the near side is searched first
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+
+        best.sort(key=lambda item: -item[0])
+        return [(_chord_to_km(-d), self._payloads[i]) for d, i in best]
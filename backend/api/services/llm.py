@@ -0,0 +1,262 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+from backend.api.services.profiling import profiled
+from backend.api.services.prompts import count_tokens, input_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "15"))
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "4"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "2"))
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# Attempts run here so a call can be abandoned at its deadline; abandoned
+# attempts end on their own when the client-level timeout fires.
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_MAX_THREADS", "32")), thread_name_prefix="llm")
+
+
+class LLMUnavailable(RuntimeError):
+    """The model could not answer in time: breaker open, deadline passed or every attempt failed."""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker. After `failure_threshold` consecutive failed
+    calls it opens and rejects calls for `reset_timeout` seconds, then lets a
+    single probe through (half-open); the probe's outcome closes or reopens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.total_calls = 0
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                self.total_calls += 1
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self.total_calls += 1
+                return True
+            self.total_rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, error: str):
+        with self._lock:
+            self.total_failures += 1
+            self.last_error = error
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)) if state == self.OPEN else 0.0
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_in_seconds": round(retry_in, 3),
+                "total_calls": self.total_calls,
+                "total_failures": self.total_failures,
+                "total_rejected": self.total_rejected,
+                "last_error": self.last_error,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def endpoint_key(model: str, base_url: Optional[str] = None) -> str:
+    return f"{(base_url or DEFAULT_BASE_URL).rstrip('/')}#{model}"
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker()
+        return _breakers[endpoint]
+
+
+def breaker_states() -> Dict[str, dict]:
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {endpoint: b.snapshot() for endpoint, b in breakers.items()}
+
+
+_usage: Dict[str, Counter] = {}
+_usage_lock = threading.Lock()
+
+
+def record_usage(route: str, input: Any, output: Any):
+    """
+    Add one call's tokens to its route. Counts come from the provider's
+    usage metadata when the response has it, else they are estimated from
+    the prompt and completion text.
+    """
+    meta = getattr(output, "usage_metadata", None) or {}
+    if meta.get("input_tokens") is not None:
+        prompt, completion = meta["input_tokens"], meta.get("output_tokens") or 0
+        cached = (meta.get("input_token_details") or {}).get("cache_read") or 0
+        estimated = 0
+    else:
+        content = getattr(output, "content", output)
+        prompt = count_tokens(input_text(input))
+        completion = count_tokens(content if isinstance(content, str) else "")
+        cached, estimated = 0, 1
+    with _usage_lock:
+        usage = _usage.setdefault(route, Counter())
+        usage.update(calls=1, prompt_tokens=prompt, completion_tokens=completion,
+                     cached_prompt_tokens=cached, estimated_calls=estimated)
+
+
+def token_usage() -> Dict[str, dict]:
+    """Token totals per route since startup."""
+    fields = ("calls", "prompt_tokens", "completion_tokens", "cached_prompt_tokens", "estimated_calls")
+    with _usage_lock:
+        return {route: {f: usage[f] for f in fields} for route, usage in _usage.items()}
+
+
+def reset_token_usage():
+    with _usage_lock:
+        _usage.clear()
+
+
+class GuardedLLM:
+    """
+    Wraps a chat model so every call has a deadline, shares a circuit breaker
+    with other callers of the same model endpoint, and sends a hedged second
+    attempt if the first is slow or fails. The client is built lazily, so
+    importing a router does not need OPENAI_API_KEY. Tokens of successful
+    calls are recorded under `route` (the model name by default).
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        model: str,
+        base_url: Optional[str] = None,
+        deadline: float = LLM_DEADLINE_SECONDS,
+        hedge_after: float = LLM_HEDGE_AFTER_SECONDS,
+        max_attempts: int = LLM_MAX_ATTEMPTS,
+        route: Optional[str] = None,
+    ):
+        self._factory = factory
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.model = model
+        self.route = route or model
+        self.endpoint = endpoint_key(model, base_url)
+        self.breaker = get_breaker(self.endpoint)
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.max_attempts = max(1, max_attempts)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def _submit(self, input: Any):
+        # Each attempt runs in a copy of the caller's context, so context variables set by the request carry over
+        return _executor.submit(contextvars.copy_context().run, profiled(f"llm:{self.model}", self.client.invoke), input)
+
+    def invoke(self, input: Any, deadline: Optional[float] = None):
+        if not self.breaker.allow():
+            raise LLMUnavailable(f"LLM circuit open for {self.endpoint}")
+
+        budget = self.deadline if deadline is None else deadline
+        end = time.monotonic() + budget
+        try:
+            pending = {self._submit(input)}
+        except Exception as e:
+            self.breaker.record_failure(repr(e))
+            raise LLMUnavailable(f"LLM call failed: {e}") from e
+        attempts, last_error = 1, None
+
+        while pending:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            can_hedge = attempts < self.max_attempts
+            done, pending = wait(
+                pending,
+                timeout=min(remaining, self.hedge_after) if can_hedge else remaining,
+                return_when=FIRST_COMPLETED,
+            )
+            for fut in done:
+                if fut.exception() is None:
+                    self.breaker.record_success()
+                    record_usage(self.route, input, fut.result())
+                    return fut.result()
+                last_error = fut.exception()
+            # Hedge when the first attempt is slow; retry at once when it failed
+            if can_hedge and (done or pending):
+                pending.add(self._submit(input))
+                attempts += 1
+            elif not can_hedge and not pending:
+                break
+
+        if last_error is None:
+            last_error = TimeoutError(f"no response within {budget:.1f}s")
+        self.breaker.record_failure(repr(last_error))
+        raise LLMUnavailable(f"LLM unavailable ({self.endpoint}): {last_error}") from last_error
+
+
+def chat_model(model: str = "gpt-4o-mini", **kwargs) -> GuardedLLM:
+    """GuardedLLM around ChatOpenAI; the client's own timeout matches the call deadline."""
+    deadline = kwargs.pop("deadline", LLM_DEADLINE_SECONDS)
+    route = kwargs.pop("route", None)
+    base_url = kwargs.get("base_url") or os.getenv("OPENAI_BASE_URL")
+
+    def factory():
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model=model, timeout=deadline, max_retries=0, **kwargs)
+
+    return GuardedLLM(factory, model=model, base_url=base_url, deadline=deadline, route=route)
@@ -0,0 +1,117 @@
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+_TIME_RE = re.compile(r"^\s*(\d{1,2})(?:[:.](\d{2}))?\s*(?:([ap])\.?\s*m\.?)?\s*$", re.IGNORECASE)
+
+
+def parse_time(value: str) -> int:
+    """Parse '7:00 AM', '22:00' or '10pm' into minutes since midnight."""
+    m = _TIME_RE.match(value or "")
+    if not m:
+        raise ValueError(f"Unrecognised time: {value!r}")
+    hour = int(m.group(1))
+    minute = int(m.group(2) or 0)
+    meridiem = (m.group(3) or "").lower()
+
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"Unrecognised time: {value!r}")
+        hour = hour % 12 + (12 if meridiem == "p" else 0)
+    elif m.group(2) is None:
+        # A bare number like "10" is ambiguous, so require ":MM" or am/pm
+        raise ValueError(f"Unrecognised time: {value!r}")
+
+    if hour > 24 or minute > 59 or (hour == 24 and minute):
+        raise ValueError(f"Unrecognised time: {value!r}")
+    return (hour * 60 + minute) % MINUTES_PER_DAY
+
+
+def format_time(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def parse_hours(open_time: str, close_time: str) -> List[Tuple[int, int]]:
+    """
+    Convert text opening hours into half-open [start, end) minute intervals
+    within one day. Hours that cross midnight are split in two, and equal
+    open/close times mean the outlet never closes.
+    """
+    start = parse_time(open_time)
+    end = parse_time(close_time)
+    if start == end:
+        return [(0, MINUTES_PER_DAY)]
+    if start < end:
+        return [(start, end)]
+    intervals = [(start, MINUTES_PER_DAY)]
+    if end > 0:
+        intervals.insert(0, (0, end))
+    return intervals
+
+
+def _city_key(city: Optional[str]) -> str:
+    return (city or "").strip().casefold()
+
+
+class _Timeline:
+    """
+    Precomputed day timeline for one city: the sorted boundaries where any
+    outlet opens or closes, and the outlets open in each segment between
+    consecutive boundaries. A lookup is one bisect.
+    """
+
+    __slots__ = ("boundaries", "open_sets")
+
+    def __init__(self, entries: List[Tuple[List[Tuple[int, int]], dict]]):
+        points = {0}
+        for intervals, _ in entries:
+            for start, end in intervals:
+                points.add(start)
+                if end < MINUTES_PER_DAY:
+                    points.add(end)
+        self.boundaries = sorted(points)
+        self.open_sets: List[Tuple[dict, ...]] = []
+        for b in self.boundaries:
+            self.open_sets.append(tuple(
+                row for intervals, row in entries
+                if any(start <= b < end for start, end in intervals)
+            ))
+
+    def at(self, minute: int) -> Tuple[dict, ...]:
+        return self.open_sets[bisect_right(self.boundaries, minute) - 1]
+
+
+class OpenHoursIndex:
+    """Answers "which outlets are open at T" per city (or across all cities)."""
+
+    def __init__(self, rows: Iterable[dict]):
+        per_city: Dict[str, list] = {}
+        everything: list = []
+        self.skipped: List[dict] = []
+
+        for row in rows:
+            try:
+                intervals = parse_hours(row["open_time"], row["close_time"])
+            except (KeyError, TypeError, ValueError):
+                self.skipped.append(row)
+                continue
+            entry = (intervals, row)
+            per_city.setdefault(_city_key(row.get("city")), []).append(entry)
+            everything.append(entry)
+
+        self._cities = {key: _Timeline(entries) for key, entries in per_city.items()}
+        self._all = _Timeline(everything)
+
+    @property
+    def cities(self) -> List[str]:
+        return sorted(self._cities)
+
+    def open_at(self, minute: int, city: Optional[str] = None) -> Tuple[dict, ...]:
+        if not 0 <= minute < MINUTES_PER_DAY:
+            raise ValueError("minute must be within a single day.")
+        if city is None:
+            return self._all.at(minute)
+        timeline = self._cities.get(_city_key(city))
+        return timeline.at(minute) if timeline else ()
@@ -0,0 +1,27 @@
+import base64
+import json
+from typing import Any, Iterable, Iterator
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def encode_cursor(key: dict) -> str:
+    """Opaque, URL-safe cursor for the last row of a page."""
+    raw = json.dumps(key, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+    if not isinstance(key, dict):
+        raise ValueError("Invalid cursor.")
+    return key
+
+
+def ndjson_lines(items: Iterable[Any]) -> Iterator[bytes]:
+    for item in items:
+        yield json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n"
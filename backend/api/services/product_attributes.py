@@ -0,0 +1,248 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ATTRIBUTES_FILE = "attributes.npz"
+
+OZ_TO_ML = 29.5735
+
+# Boolean features: (regex over the product text, regex over the user query)
+FEATURES: Dict[str, tuple] = {
+    "insulated": (
+        r"vacuum|insulat|double[- ]wall|thermos|heat retention|cold retention",
+        r"insulat|vacuum|thermal|thermos|double[- ]wall|keeps? (?:\w+ )?(?:hot|cold|warm)",
+    ),
+    # A screw-on lid is how the shop describes its sealed tumblers
+    "leak_proof": (
+        r"leak[- ]?proof|spill[- ]?proof|screw[- ]on lid",
+        r"leak[- ]?proof|spill[- ]?proof|no[- ]leak|won'?t leak|doesn'?t leak",
+    ),
+    "stainless_steel": (r"stainless|\bsus ?(?:304|316|201)\b", r"stainless|\bsteel\b"),
+    "ceramic": (r"ceramic", r"ceramic"),
+    "glass": (r"\bglass\b", r"\bglass\b"),
+    "straw": (r"\bstraw", r"\bstraw"),
+}
+
+_ML_RE = re.compile(r"(\d+(?:\.\d+)?)\s*ml\b", re.IGNORECASE)
+_LITRE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:l|litres?|liters?)\b", re.IGNORECASE)
+_OZ_RE = re.compile(r"(\d+(?:\.\d+)?)\s*oz\b", re.IGNORECASE)
+
+
+def _capacity_ml(texts: Iterable[str]) -> Optional[int]:
+    """First volume found, preferring ml, then litres, then fluid ounces."""
+    texts = [t for t in texts if t]
+    for pattern, scale in ((_ML_RE, 1.0), (_LITRE_RE, 1000.0), (_OZ_RE, OZ_TO_ML)):
+        for text in texts:
+            m = pattern.search(text)
+            if m:
+                return int(round(float(m.group(1)) * scale))
+    return None
+
+
+def extract_attributes(row: dict) -> dict:
+    """
+    Typed attributes for one scraped product row: capacity_ml, the price
+    range over its variants, and one boolean per FEATURES key. Missing
+    values are None.
+    """
+    measurements = list(row.get("measurements") or [])
+    materials = list(row.get("materials") or [])
+    variants = [v for v in row.get("variants") or [] if isinstance(v, dict)]
+    title = row.get("title") or ""
+
+    prices = [v["price_rm"] for v in variants if isinstance(v.get("price_rm"), (int, float))]
+    if not prices and isinstance(row.get("price_rm"), (int, float)):
+        prices = [row["price_rm"]]
+
+    text = " ".join([title, *measurements, *materials, *(v.get("name") or "" for v in variants),
+                     row.get("short_description") or ""]).lower()
+
+    attrs = {
+        "capacity_ml": _capacity_ml([*measurements, title]),
+        "price_min_rm": float(min(prices)) if prices else None,
+        "price_max_rm": float(max(prices)) if prices else None,
+    }
+    for name, (doc_pattern, _) in FEATURES.items():
+        attrs[name] = bool(re.search(doc_pattern, text))
+    return attrs
+
+
+@dataclass(frozen=True)
+class QueryConstraints:
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_capacity_ml: Optional[float] = None
+    max_capacity_ml: Optional[float] = None
+    features: FrozenSet[str] = field(default_factory=frozenset)
+
+    @property
+    def is_empty(self) -> bool:
+        return self == QueryConstraints()
+
+    def as_dict(self) -> dict:
+        out = {k: v for k, v in self.__dict__.items() if v is not None and k != "features"}
+        if self.features:
+            out["features"] = sorted(self.features)
+        return out
+
+
+_NUM = r"(\d+(?:\.\d+)?)"
+_RM = rf"rm\s*{_NUM}"
+_PRICE_MAX_RE = re.compile(rf"(?:under|below|less than|cheaper than|max(?:imum)?|up to|within|<=?)\s*{_RM}")
+_PRICE_MIN_RE = re.compile(rf"(?:over|above|more than|at least|min(?:imum)?|from|>=?)\s*{_RM}")
+_PRICE_RANGE_RE = re.compile(rf"{_RM}\s*(?:-|to|and)\s*(?:rm\s*)?{_NUM}")
+_PRICE_TRAILING_MAX_RE = re.compile(rf"{_RM}\s*(?:or less|or below|and below|max)")
+
+_VOLUME = rf"{_NUM}\s*(ml|l|litres?|liters?|oz)\b"
+_CAP_MAX_RE = re.compile(rf"(?:under|below|less than|smaller than|max(?:imum)?|up to|<=?)\s*{_VOLUME}")
+_CAP_MIN_RE = re.compile(rf"(?:over|above|more than|bigger than|larger than|at least|min(?:imum)?|>=?)\s*{_VOLUME}")
+_CAP_RE = re.compile(_VOLUME)
+
+CAPACITY_TOLERANCE = 0.1  # a bare "500ml" matches 450-550ml
+
+
+def _to_ml(value: str, unit: str) -> float:
+    unit = unit.lower()
+    if unit == "ml":
+        return float(value)
+    if unit == "oz":
+        return float(value) * OZ_TO_ML
+    return float(value) * 1000.0
+
+
+def parse_constraints(query: str) -> QueryConstraints:
+    """
+    Price, capacity and feature constraints stated in a product query, e.g.
+    "leak-proof tumbler under RM100, 500ml".
+    """
+    q = query.lower()
+    min_price = max_price = min_cap = max_cap = None
+
+    m = _PRICE_RANGE_RE.search(q)
+    if m:
+        low, high = sorted((float(m.group(1)), float(m.group(2))))
+        min_price, max_price = low, high
+    else:
+        m = _PRICE_MAX_RE.search(q) or _PRICE_TRAILING_MAX_RE.search(q)
+        if m:
+            max_price = float(m.group(1))
+        m = _PRICE_MIN_RE.search(q)
+        if m:
+            min_price = float(m.group(1))
+
+    m_max, m_min = _CAP_MAX_RE.search(q), _CAP_MIN_RE.search(q)
+    if m_max:
+        max_cap = _to_ml(*m_max.groups())
+    if m_min:
+        min_cap = _to_ml(*m_min.groups())
+    if not m_max and not m_min:
+        m = _CAP_RE.search(q)
+        if m:
+            target = _to_ml(*m.groups())
+            min_cap, max_cap = target * (1 - CAPACITY_TOLERANCE), target * (1 + CAPACITY_TOLERANCE)
+
+    features = frozenset(name for name, (_, query_pattern) in FEATURES.items() if re.search(query_pattern, q))
+    return QueryConstraints(min_price, max_price, min_cap, max_cap, features)
+
+
+class AttributeTable:
+    """
+    Typed attribute columns aligned with FAISS positions, so a query's
+    constraints become a set of candidate ids before any vector is scored.
+    Unknown numbers are NaN and never satisfy a constraint on that column.
+    """
+
+    def __init__(self, capacity_ml: np.ndarray, price_min: np.ndarray, price_max: np.ndarray,
+                 features: Dict[str, np.ndarray]):
+        self.capacity_ml = capacity_ml
+        self.price_min = price_min
+        self.price_max = price_max
+        self.features = features
+
+    def __len__(self) -> int:
+        return len(self.capacity_ml)
+
+    @classmethod
+    def from_metadata(cls, metadatas: Iterable[dict]) -> "AttributeTable":
+        metadatas = list(metadatas)
+
+        def column(key):
+            return np.array([m.get(key) if m.get(key) is not None else np.nan for m in metadatas], dtype=np.float32)
+
+        return cls(
+            capacity_ml=column("capacity_ml"),
+            price_min=column("price_min_rm"),
+            price_max=column("price_max_rm"),
+            features={name: np.array([bool(m.get(name)) for m in metadatas], dtype=bool) for name in FEATURES},
+        )
+
+    def save(self, path: Path):
+        np.savez(
+            Path(path) / ATTRIBUTES_FILE,
+            capacity_ml=self.capacity_ml,
+            price_min=self.price_min,
+            price_max=self.price_max,
+            **{f"feature_{name}": values for name, values in self.features.items()},
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "AttributeTable":
+        with np.load(Path(path) / ATTRIBUTES_FILE) as data:
+            return cls(
+                capacity_ml=data["capacity_ml"],
+                price_min=data["price_min"],
+                price_max=data["price_max"],
+                features={
+                    name: data[f"feature_{name}"] if f"feature_{name}" in data.files else np.zeros(len(data["capacity_ml"]), bool)
+                    for name in FEATURES
+                },
+            )
+
+    def select(self, constraints: QueryConstraints) -> np.ndarray:
+        """FAISS positions (int64) of rows satisfying every constraint."""
+        mask = np.ones(len(self), dtype=bool)
+        # A product is affordable if any variant fits the budget
+        if constraints.max_price is not None:
+            mask &= self.price_min <= constraints.max_price
+        if constraints.min_price is not None:
+            mask &= self.price_max >= constraints.min_price
+        if constraints.min_capacity_ml is not None:
+            mask &= self.capacity_ml >= constraints.min_capacity_ml
+        if constraints.max_capacity_ml is not None:
+            mask &= self.capacity_ml <= constraints.max_capacity_ml
+        for name in constraints.features:
+            mask &= self.features[name]
+        return np.flatnonzero(mask).astype(np.int64)
+
+
+def _metadatas(vectordb) -> list:
+    return [vectordb.docstore.search(vectordb.index_to_docstore_id[i]).metadata or {}
+            for i in range(vectordb.index.ntotal)]
+
+
+def write_attribute_table(vectordb, path: Path):
+    AttributeTable.from_metadata(_metadatas(vectordb)).save(path)
+
+
+def load_attribute_table(path: Optional[Path], vectordb) -> Optional[AttributeTable]:
+    """
+    The table saved with an index version, else one rebuilt from docstore
+    metadata. Returns None for indexes built before attributes were
+    extracted, so their queries stay unfiltered.
+    """
+    if path is not None and (Path(path) / ATTRIBUTES_FILE).exists():
+        table = AttributeTable.load(path)
+        if len(table) == vectordb.index.ntotal:
+            return table
+        logger.warning("Ignoring %s: %d rows for %d vectors", ATTRIBUTES_FILE, len(table), vectordb.index.ntotal)
+
+    metadatas = _metadatas(vectordb)
+    if not any("capacity_ml" in m for m in metadatas):
+        return None
+    return AttributeTable.from_metadata(metadatas)
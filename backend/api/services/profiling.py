@@ -0,0 +1,247 @@
+import contextvars
+import functools
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))   # fraction of requests profiled unasked
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "32"))
+# X-Profile must carry this value; without it the header is ignored
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+
+@dataclass
+class Profile:
+    id: str
+    name: str
+    interval_ms: float
+    started_at: float = field(default_factory=time.time)
+    duration_ms: Optional[float] = None
+    samples: Counter = field(default_factory=Counter)   # collapsed stack -> sample count
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.duration_ms is not None
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "samples": sum(self.samples.values()),
+            "interval_ms": self.interval_ms,
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, as read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+    def speedscope(self) -> dict:
+        frames: List[dict] = []
+        index: Dict[str, int] = {}
+        samples, weights = [], []
+        for stack, count in sorted(self.samples.items()):
+            ids = []
+            for name in stack.split(";"):
+                if name not in index:
+                    index[name] = len(frames)
+                    frames.append({"name": name})
+                ids.append(index[name])
+            samples.append(ids)
+            weights.append(count * self.interval_ms)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.name} {self.id}",
+            "exporter": "mindhive-profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+@dataclass(frozen=True)
+class _Mark:
+    profile: Profile
+    label: str
+    base: object   # frame that entered the marked region; sampled stacks are cut there
+
+
+_current: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar("current_profile", default=None)
+_marks: Dict[int, List[_Mark]] = {}     # thread id -> nested marks on that thread
+_lock = threading.Lock()
+_sampler: Optional[threading.Thread] = None
+_store: "OrderedDict[str, Profile]" = OrderedDict()
+_armed = 0
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _collapse(frame, marks: List[_Mark]) -> str:
+    """Leaf-to-root walk, cut at the outermost mark, with each mark's label in place of its frame."""
+    labels = {id(m.base): m.label for m in marks}
+    root = marks[0].base
+    names = []
+    while frame is not None:
+        label = labels.get(id(frame))
+        names.append(label if label is not None else _frame_name(frame))
+        if frame is root:
+            break
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _sample_loop():
+    global _sampler
+    interval = PROFILE_INTERVAL_MS / 1000.0
+    while True:
+        with _lock:
+            if not _marks:
+                _sampler = None
+                return
+            targets = {tid: list(marks) for tid, marks in _marks.items()}
+        frames = sys._current_frames()
+        stacks = []
+        for tid, marks in targets.items():
+            frame = frames.get(tid)
+            if frame is not None:
+                stacks.append((marks[-1].profile, _collapse(frame, marks)))
+        del frames
+        with _lock:
+            # Finished profiles are read without the lock, so never touch them again
+            for profile, stack in stacks:
+                if not profile.done and time.perf_counter() - profile._t0 <= PROFILE_MAX_SECONDS:
+                    profile.samples[stack] += 1
+        time.sleep(interval)
+
+
+def _push(profile: Profile, label: str, base) -> int:
+    global _sampler
+    tid = threading.get_ident()
+    with _lock:
+        _marks.setdefault(tid, []).append(_Mark(profile, label, base))
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_loop, name="request-profiler", daemon=True)
+            _sampler.start()
+    return tid
+
+
+def _pop(tid: int):
+    with _lock:
+        marks = _marks.get(tid)
+        if marks:
+            marks.pop()
+            if not marks:
+                del _marks[tid]
+
+
+def profiled(label: str, fn: Callable) -> Callable:
+    """
+    Wrap a function so that, when it runs inside a profiled request (on any
+    thread), its thread is sampled under a `label` frame. Outside a profiled
+    request it costs one context-variable lookup.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        tid = _push(profile, label, sys._getframe())
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _pop(tid)
+    return wrapper
+
+
+def arm(requests: int = 1) -> int:
+    """Profile the next `requests` requests that go through maybe_profile."""
+    global _armed
+    with _lock:
+        _armed = max(0, _armed + requests)
+        return _armed
+
+
+def armed() -> int:
+    return _armed
+
+
+def _take_armed() -> bool:
+    global _armed
+    with _lock:
+        if _armed > 0:
+            _armed -= 1
+            return True
+    return False
+
+
+def _header_enabled(value: Optional[str]) -> bool:
+    # Without a token anyone could switch the sampler on, so the header does nothing
+    if not value or not PROFILING_TOKEN:
+        return False
+    return hmac.compare_digest(value.encode(), PROFILING_TOKEN.encode())
+
+
+@contextmanager
+def maybe_profile(name: str, header: Optional[str] = None) -> Iterator[Optional[Profile]]:
+    """
+    Profile the enclosed request if the X-Profile header asks for it, an
+    admin armed the profiler, or PROFILE_SAMPLE_RATE picks it. Yields the
+    Profile (stored once the block exits) or None.
+    """
+    if _current.get() is not None or not (
+        _header_enabled(header) or _take_armed() or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+    ):
+        yield None
+        return
+
+    profile = Profile(id=uuid.uuid4().hex[:12], name=name, interval_ms=PROFILE_INTERVAL_MS)
+    token = _current.set(profile)
+    # Frame 0 is this generator, 1 is contextlib's __enter__, 2 is the request handler
+    tid = _push(profile, name, sys._getframe(2))
+    try:
+        yield profile
+    finally:
+        _pop(tid)
+        _current.reset(token)
+        with _lock:
+            profile.duration_ms = (time.perf_counter() - profile._t0) * 1000.0
+            _store[profile.id] = profile
+            while len(_store) > PROFILE_MAX_STORED:
+                _store.popitem(last=False)
+
+
+def get_profile(profile_id: str) -> Optional[Profile]:
+    with _lock:
+        return _store.get(profile_id)
+
+
+def list_profiles() -> List[dict]:
+    with _lock:
+        profiles = list(_store.values())
+    return [p.summary() for p in reversed(profiles)]
@@ -0,0 +1,123 @@
+import json
+import math
+import os
+import re
+from typing import Any, Iterable, List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+# Max prompt tokens spent on product candidates in a summary prompt
+PRODUCT_CONTEXT_TOKENS = int(os.getenv("PRODUCT_CONTEXT_TOKENS", "160"))
+# "tiktoken" counts exactly, but needs the encoding file cached locally; the default is an estimate
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "estimate").strip().lower()
+
+# Fixed system prefixes. They never contain per-request text, so every call
+# starts with the same bytes and providers can reuse the cached prefix; the
+# variable part goes in a short message after them.
+
+OUTLETS_SQL_SYSTEM = (
+    "Write ONE SQLite query for the user's question about ZUS Coffee outlets.\n"
+    "Table: outlets(city TEXT, outlet TEXT, open_time TEXT, close_time TEXT)\n"
+    "SELECT exactly city, outlet, open_time, close_time FROM outlets, "
+    "optionally WHERE on a city and/or outlet named in the question.\n"
+    "No JOIN, PRAGMA, ATTACH, INSERT, UPDATE, DELETE, DROP, ALTER, UNION or comments. Return only the SQL."
+)
+
+PRODUCTS_SUMMARY_SYSTEM = (
+    "Summarize the most relevant ZUS drinkware for the user's need from the candidates given. "
+    "Return 2-4 concise bullets on what to choose and why "
+    "(capacity, insulation, leak-proof, special lids, price hints). "
+    "Only mention candidates from the list."
+)
+
+CHITCHAT_SYSTEM = (
+    "You are a helpful ZUS Coffee assistant. Be concise. Given the planner context (JSON), "
+    "briefly say what you would reply to the user now. Do not invent facts. "
+    "Offer how you can help: calculator, products, outlets."
+)
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]|\s*\n\s*| {2,}")
+_encoding = None
+
+
+def _tiktoken_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False   # not installed or not cached; keep estimating
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens in `text`: exact with PROMPT_TOKENIZER=tiktoken, else a BPE-like estimate."""
+    if not text:
+        return 0
+    if PROMPT_TOKENIZER == "tiktoken":
+        encoding = _tiktoken_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text))
+    # Common words are one token; long words and numbers split roughly every 4
+    # characters; punctuation and runs of newlines/indentation are one token each
+    return sum(max(1, math.ceil(len(m) / 4)) if m[0].isalnum() or m[0] == "_" else 1
+               for m in _WORD_RE.findall(text))
+
+
+def input_text(input: Any) -> str:
+    """The text of a prompt given as a string or a list of messages."""
+    if isinstance(input, str):
+        return input
+    parts = []
+    for m in input:
+        content = getattr(m, "content", m)
+        parts.append(content if isinstance(content, str) else json.dumps(content, ensure_ascii=False))
+    return "\n".join(parts)
+
+
+def fit_to_budget(lines: Iterable[str], budget: int) -> List[str]:
+    """Leading lines whose tokens fit in `budget`; the first line is always kept."""
+    kept, used = [], 0
+    for line in lines:
+        cost = count_tokens(line)
+        if kept and used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return kept
+
+
+def outlets_sql_messages(query: str) -> List[BaseMessage]:
+    return [SystemMessage(content=OUTLETS_SQL_SYSTEM), HumanMessage(content=query)]
+
+
+def _candidate_line(hit: Any) -> str:
+    title = getattr(hit, "title", None) or "Unknown item"
+    price = getattr(hit, "price_rm", None)
+    capacity = getattr(hit, "capacity_ml", None)
+    facts = [f"RM{price:,.2f}" if isinstance(price, (int, float)) else None,
+             f"{capacity}ml" if capacity else None]
+    facts = ", ".join(f for f in facts if f)
+    return f"- {title}" + (f" ({facts})" if facts else "")
+
+
+def products_summary_messages(query: str, hits: Iterable[Any], budget: Optional[int] = None) -> List[BaseMessage]:
+    """
+    Summary prompt for the best-ranked hits, as many as fit in `budget`
+    tokens (PRODUCT_CONTEXT_TOKENS by default). URLs are left out; the
+    client already gets them with the hits.
+    """
+    lines = fit_to_budget((_candidate_line(h) for h in hits), PRODUCT_CONTEXT_TOKENS if budget is None else budget)
+    return [
+        SystemMessage(content=PRODUCTS_SUMMARY_SYSTEM),
+        HumanMessage(content=f"User query: {query}\nCandidates:\n" + "\n".join(lines)),
+    ]
+
+
+def chitchat_messages(planner_context: dict) -> List[BaseMessage]:
+    context = {k: v for k, v in planner_context.items() if v not in (None, {}, [], "")}
+    return [
+        SystemMessage(content=CHITCHAT_SYSTEM),
+        HumanMessage(content=json.dumps(context, ensure_ascii=False, separators=(",", ":"))),
+    ]
@@ -0,0 +1,109 @@
+import json
+import logging
+import mmap
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Iterator, Union
+
+import faiss
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+DOCS_FILE = "docstore.jsonl"
+OFFSETS_FILE = "docstore.offsets"
+
+# Flat-index codes are mmapped straight from index.faiss, so every worker process
+# reading the same version shares one copy in the page cache.
+MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+def write_shared_docstore(vectordb: FAISS, path: Path):
+    """
+    Write the docstore as JSON lines in FAISS position order plus a table of
+    byte offsets, next to index.faiss/index.pkl.
+    """
+    path = Path(path)
+    offsets = array("Q", [0])
+    with open(path / DOCS_FILE, "wb") as f:
+        for i in range(vectordb.index.ntotal):
+            doc = vectordb.docstore.search(vectordb.index_to_docstore_id[i])
+            line = json.dumps(
+                {"id": vectordb.index_to_docstore_id[i], "page_content": doc.page_content, "metadata": doc.metadata},
+                ensure_ascii=False,
+            ).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    with open(path / OFFSETS_FILE, "wb") as f:
+        offsets.tofile(f)
+
+
+def _map(path: Path) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PositionIds(Mapping):
+    """index_to_docstore_id for a shared docstore: FAISS position i maps to id str(i)."""
+
+    def __init__(self, n: int):
+        self._n = n
+
+    def __getitem__(self, i: int) -> str:
+        if not 0 <= i < self._n:
+            raise KeyError(i)
+        return str(i)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self._n))
+
+    def __len__(self) -> int:
+        return self._n
+
+
+class MmapDocstore(Docstore):
+    """Read-only docstore backed by mmapped files; documents are decoded on lookup."""
+
+    def __init__(self, path: Path):
+        self._docs = _map(Path(path) / DOCS_FILE)
+        self._offsets_map = _map(Path(path) / OFFSETS_FILE)
+        self._offsets = memoryview(self._offsets_map).cast("Q")
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def search(self, search: str) -> Union[str, Document]:
+        try:
+            i = int(search)
+        except ValueError:
+            return f"ID {search} not found."
+        if not 0 <= i < len(self):
+            return f"ID {search} not found."
+        row = json.loads(self._docs[self._offsets[i]:self._offsets[i + 1]])
+        return Document(page_content=row["page_content"], metadata=row["metadata"])
+
+
+def has_shared_docstore(path: Path) -> bool:
+    return (Path(path) / DOCS_FILE).exists() and (Path(path) / OFFSETS_FILE).exists()
+
+
+def open_shared_index(path: Path, embeddings: Embeddings) -> FAISS:
+    """
+    Open an index version with the vectors and (when available) the docstore
+    mmapped read-only. Versions written before the shared docstore existed
+    fall back to unpickling index.pkl into this process.
+    """
+    path = Path(path)
+    if not has_shared_docstore(path):
+        logger.info("No shared docstore in %s; unpickling index.pkl per worker", path)
+        return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True, io_flags=MMAP_FLAGS)
+
+    index = faiss.read_index(str(path / "index.faiss"), MMAP_FLAGS)
+    docstore = MmapDocstore(path)
+    if len(docstore) != index.ntotal:
+        raise ValueError(f"Docstore in {path} has {len(docstore)} entries but the index has {index.ntotal}.")
+    return FAISS(embeddings, index, docstore, PositionIds(index.ntotal))
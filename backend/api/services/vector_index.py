@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+LEGACY_VERSION = "legacy"
+
+
+@dataclass(frozen=True)
+class IndexHandle:
+    """One loaded index version. Handles are immutable; a reload builds a new one."""
+    version: str
+    path: Path
+    vectordb: Any
+    loaded_at: float
+    load_seconds: float
+
+
+def read_current_version(root: Path) -> Optional[str]:
+    """Version named by root/CURRENT, if it points at an existing directory."""
+    try:
+        version = (Path(root) / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    if version and (Path(root) / version).is_dir():
+        return version
+    return None
+
+
+def publish_version(root: Path, version: str):
+    """Point root/CURRENT at version. Written via rename so readers never see a partial name."""
+    root = Path(root)
+    tmp = root / f".{CURRENT_FILE}.{os.getpid()}.tmp"
+    tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp, root / CURRENT_FILE)
+
+
+class VersionedIndex:
+    """
+    Holds the live product index and swaps in newer versions published under
+    root/<version>/ (see ingest/rag.py). Readers call current() once per
+    request and keep that handle, so an in-flight query finishes on the
+    version it started with. The old version is released once the last
+    reader drops its handle.
+    """
+
+    def __init__(self, root: Path, legacy_dir: Optional[Path], loader: Callable[[Path], Any]):
+        self.root = Path(root)
+        self.legacy_dir = Path(legacy_dir) if legacy_dir else None
+        self._loader = loader
+        self._handle: Optional[IndexHandle] = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+
+    def _locate(self) -> tuple[str, Path]:
+        version = read_current_version(self.root)
+        if version:
+            return version, self.root / version
+        if self.legacy_dir and (self.legacy_dir / "index.faiss").exists() and (self.legacy_dir / "index.pkl").exists():
+            return LEGACY_VERSION, self.legacy_dir
+        raise FileNotFoundError("FAISS index not found in data/. Run ingest script first.")
+
+    def _load(self, version: str, path: Path) -> IndexHandle:
+        start = time.perf_counter()
+        vectordb = self._loader(path)
+        return IndexHandle(
+            version=version,
+            path=path,
+            vectordb=vectordb,
+            loaded_at=time.time(),
+            load_seconds=time.perf_counter() - start,
+        )
+
+    def current(self) -> IndexHandle:
+        handle = self._handle
+        if handle is None:
+            with self._load_lock:
+                if self._handle is None:
+                    self._handle = self._load(*self._locate())
+                handle = self._handle
+        return handle
+
+    def refresh(self) -> bool:
+        """Load the published version if it differs from the live one. Returns True on swap."""
+        with self._load_lock:
+            version, path = self._locate()
+            if self._handle is not None and self._handle.version == version:
+                return False
+            new = self._load(version, path)
+            # A single reference assignment: readers see either the old or the new handle
+            old, self._handle = self._handle, new
+        logger.info("Product index swapped %s -> %s (%.2fs)", old.version if old else None, version, new.load_seconds)
+        del old
+        return True
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the current version; retry on the next tick
+                self.last_error = str(e)
+                logger.warning("Product index reload failed: %s", e)
+
+    def start_watcher(self, interval: float = 10.0):
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="product-index-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join(timeout=5)
+            self._watcher = None
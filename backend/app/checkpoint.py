@@ -0,0 +1,187 @@
+import hashlib
+import os
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, SerializerProtocol
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+KEYFRAME_INTERVAL = int(os.getenv("CHECKPOINT_KEYFRAME_INTERVAL", "16"))
+COMPRESS_MIN_BYTES = 256   # smaller payloads are not worth the zlib header
+COMPRESS_LEVEL = 1         # fastest level; state is mostly repeated keys and short text
+
+_ZLIB = "zlib+"
+_DELTA = "delta+"
+
+
+class _Encoded:
+    """A value the saver has already encoded; CompressedSerializer passes it through."""
+    __slots__ = ("entry",)
+
+    def __init__(self, entry: Tuple[str, bytes]):
+        self.entry = entry
+
+
+class CompressedSerializer(SerializerProtocol):
+    """Wraps a serializer and zlib-compresses its payloads above COMPRESS_MIN_BYTES."""
+
+    def __init__(self, inner: Optional[SerializerProtocol] = None):
+        self.inner = inner or JsonPlusSerializer()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if isinstance(obj, _Encoded):
+            return obj.entry
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) >= COMPRESS_MIN_BYTES:
+            return _ZLIB + type_, zlib.compress(data, COMPRESS_LEVEL)
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.startswith(_ZLIB):
+            return self.inner.loads_typed((type_[len(_ZLIB):], zlib.decompress(payload)))
+        return self.inner.loads_typed((type_, payload))
+
+
+@dataclass
+class _Head:
+    version: Any
+    length: int               # items in the list written at `version`
+    last: Optional[bytes]     # digest of its last item
+    depth: int                # deltas since the last keyframe
+
+
+class CompactMemorySaver(MemorySaver):
+    """
+    MemorySaver that keeps conversation state small. MemorySaver already
+    writes only the channels that changed in a step; on top of that:
+
+    - list channels (`messages`) are stored as the items appended since the
+      previous version of that channel, with a full keyframe every
+      KEYFRAME_INTERVAL versions so a read replays at most that many deltas;
+    - node writes to a list channel (each node returns the whole AppState)
+      are stored the same way, relative to the channel's latest version;
+    - every serialized payload is zlib-compressed.
+
+    An append is recognised by the previous length and a digest of the
+    previous last item, so no copies of messages are kept between steps. A
+    list that got shorter or whose old last item changed (a message was
+    removed or replaced) is written as a keyframe.
+    """
+
+    def __init__(self, *, serde: Optional[SerializerProtocol] = None, keyframe_interval: int = KEYFRAME_INTERVAL):
+        super().__init__(serde=CompressedSerializer(serde))
+        self.keyframe_interval = keyframe_interval
+        self._heads: Dict[tuple, _Head] = {}
+
+    def _digest(self, item: Any) -> bytes:
+        return hashlib.blake2b(self.serde.inner.dumps_typed(item)[1], digest_size=16).digest()
+
+    def _encode_list(self, head_key: tuple, value: list, max_depth: int) -> Tuple[Tuple[str, bytes], int]:
+        """Delta against the channel's latest version when `value` only appends to it, else a keyframe."""
+        head = self._heads.get(head_key)
+        n = head.length if head else 0
+        if (
+            head is not None
+            and head.depth < max_depth
+            and len(value) >= n
+            and (n == 0 or self._digest(value[n - 1]) == head.last)
+        ):
+            type_, data = self.serde.dumps_typed([head.version, value[n:]])
+            return (_DELTA + type_, data), head.depth + 1
+        return self.serde.dumps_typed(value), 0
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        values = checkpoint["channel_values"]
+        lists = {k: v for k, v in new_versions.items() if isinstance(values.get(k), list)}
+
+        # Let MemorySaver write everything except list channels, which are stored as deltas
+        others = {k: v for k, v in new_versions.items() if k not in lists}
+        saved = super().put(config, checkpoint, metadata, others)
+        for channel, version in lists.items():
+            # One snapshot for both the stored entry and the head: nodes may
+            # keep appending to the live list while a background put runs
+            items = list(values[channel])
+            head_key = (thread_id, checkpoint_ns, channel)
+            entry, depth = self._encode_list(head_key, items, self.keyframe_interval)
+            self.blobs[(thread_id, checkpoint_ns, channel, version)] = entry
+            self._heads[head_key] = _Head(version, len(items), self._digest(items[-1]) if items else None, depth)
+        return saved
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        encoded = [
+            (c, _Encoded(self._encode_list((thread_id, checkpoint_ns, c), list(v), self.keyframe_interval + 1)[0]))
+            if isinstance(v, list) else (c, v)
+            for c, v in writes
+        ]
+        super().put_writes(config, encoded, task_id, task_path)
+
+    def _ordered_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[tuple]:
+        # Readers call serde.loads_typed on these, so hand back delta writes as full values
+        return [
+            (task_id, c, self.serde.dumps_typed(self._rebuild(thread_id, checkpoint_ns, c, entry)), path)
+            if entry[0].startswith(_DELTA) else (task_id, c, entry, path)
+            for task_id, c, entry, path in super()._ordered_writes(thread_id, checkpoint_ns, checkpoint_id)
+        ]
+
+    def _rebuild(self, thread_id: str, checkpoint_ns: str, channel: str, entry: Tuple[str, bytes]) -> Any:
+        """Rebuild a value by walking delta entries back to the nearest keyframe."""
+        appends = []
+        while entry[0].startswith(_DELTA):
+            base, items = self.serde.loads_typed((entry[0][len(_DELTA):], entry[1]))
+            appends.append(items)
+            entry = self.blobs[(thread_id, checkpoint_ns, channel, base)]
+        value = self.serde.loads_typed(entry)
+        for items in reversed(appends):
+            value.extend(items)
+        return value
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for k, ver in versions.items():
+            entry = self.blobs.get((thread_id, checkpoint_ns, k, ver))
+            if entry is None or entry[0] == "empty":
+                continue
+            result[k] = self._rebuild(thread_id, checkpoint_ns, k, entry)
+        return result
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        for key in [k for k in self._heads if k[0] == thread_id]:
+            del self._heads[key]
+
+
+def stored_bytes(saver: MemorySaver, thread_id: Optional[str] = None) -> int:
+    """Bytes a MemorySaver holds for checkpoints, channel values and pending writes."""
+    total = 0
+    for key, (type_, data) in saver.blobs.items():
+        if thread_id is None or key[0] == thread_id:
+            total += len(type_) + len(data)
+    for tid, namespaces in saver.storage.items():
+        if thread_id is None or tid == thread_id:
+            for checkpoints in namespaces.values():
+                for (t1, d1), (t2, d2), _ in checkpoints.values():
+                    total += len(t1) + len(d1) + len(t2) + len(d2)
+    for key, writes in saver.writes.items():
+        if thread_id is None or key[0] == thread_id:
+            total += sum(len(t) + len(d) for _, _, (t, d), _ in writes.values())
+    return total
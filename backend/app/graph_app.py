@@ -1,16 +1,20 @@
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from typing import TypedDict, Dict, Any, Optional, List
 from langchain_core.prompts import ChatPromptTemplate
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph.message import add_messages
 from langgraph.graph import StateGraph, END
 from typing_extensions import Annotated
-from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 import httpx
-import json
 import os
-import re
+
+from backend.api.services.llm import LLMUnavailable, chat_model
+from backend.app.checkpoint import CompactMemorySaver
+from backend.app.planner import plan
+from backend.api.services.profiling import profiled
+from backend.api.services.prompts import chitchat_messages
 
 load_dotenv()
 
@@ -21,6 +25,7 @@ BACKEND_BASE_URL = os.getenv(
 CALC_URL = f"{BACKEND_BASE_URL}/api/v1/calculator"
 PRODUCTS_URL = f"{BACKEND_BASE_URL}/api/v1/products"
 OUTLETS_URL = f"{BACKEND_BASE_URL}/api/v1/outlets"
+OUTLETS_OPEN_URL = f"{BACKEND_BASE_URL}/api/v1/outlets/open"
 
 
 #State
@@ -34,68 +39,8 @@ class AppState(TypedDict):
     error: Optional[str]
 
 
-llm = ChatOpenAI(model="gpt-4o-mini",api_key=os.getenv("OPENAI_API_KEY"))  
-
-
-#INTENT & SLOTS
-
-def detect_intent(text: str) -> str:
-    t = text.lower().strip()
-
-    product_keys = ["drinkware","bottle","tumbler","cup","thermos","insulated","vacuum","product","products"]
-    if any(k in t for k in product_keys) or "drink" in t or "beverage" in t:
-        return "products"
-
-    if re.search(r"\boutlet(s)?\b|\bbranch(es)?\b|\bstore(s)?\b|\blocation(s)?\b|\bopening hours?\b|\bclosing time\b|\bhours?\b", t):
-    return "outlet_query"
-
-    if re.search(r"\d+\s*[-+*/]\s*\d+", t):
-        return "calc"
-
-    return "chitchat"
-
-
-PRODUCT_KEYWORDS = {"drinkware","bottle","tumbler","cup","thermos","insulated","vacuum"}
-
-CITY_PATTERNS = {r"\bkuala\s+lumpur\b|\bkl\b": "Kuala Lumpur", 
-    r"\bpetaling\s+jaya\b|\bpj\b": "Petaling Jaya", 
-    r"\bampang\b": "Ampang",}
-
-def update_slots(slots: Dict[str, Any], text: str) -> Dict[str, Any]:
-    """Extract structured details from the latest user text and merge into slots."""
-    t = text.lower()
-    new = dict(slots)
-
-    # Outlet
-    for pattern, name in CITY_PATTERNS.items():
-        if re.search(pattern, t):
-            new["city"] = name
-            break
-
-    if re.search(r"\bwangsa\s+maju\b", t):
-        new["outlet"] = "Wangsa Maju"
-
-    # Petaling Jaya → Damansara Perdana
-    if re.search(r"\bdamansara\s+perdana\b", t):
-        new["outlet"] = "Damansara Perdana"
+llm = chat_model("gpt-4o-mini", route="chitchat")
 
-    # Ampang → Bandar Baru Ampang
-    if re.search(r"\bbandar\s+baru\s+ampang\b", t):
-        new["outlet"] = "Bandar Baru Ampang"
-
-
-    # Calculator expression 
-    expr_match = re.search(r"(?<!\w)(-?\d+(?:\s*[-+*/]\s*-?\d+)+)(?!\w)", t)
-    if expr_match:
-        new["expr"] = re.sub(r"\s+", "", expr_match.group(1))
-    else:
-        new.pop("expr", None)
-
-    # Product query 
-    if any(k in t for k in PRODUCT_KEYWORDS) or re.search(r"\b(drink|beverage)\b", t):
-        new["product_query"] = text.strip()
-
-    return new
 
 # PLANNER NODE 
 
@@ -109,62 +54,32 @@ def planner_node(state: AppState) -> AppState:
     state["tool_result"] = None
     state["tool_name"] = None
 
-    # 3) Intent + slots
-    intent = detect_intent(text)
-    slots = dict(state.get("slots") or {})  # robust copy
+    # 3) Intent, slots and next action (pure, see backend/app/planner.py)
+    step = plan(text, state.get("slots"))
 
-    # Drop irrelevant leftovers by intent
-    if intent == "products":
-        slots.pop("expr", None); slots.pop("city", None); slots.pop("outlet", None)
-    elif intent == "outlet_query":
-        slots.pop("expr", None); slots.pop("product_query", None)
-    elif intent == "calc":
-        slots.pop("product_query", None); slots.pop("city", None); slots.pop("outlet", None)
-
-    # Extract fresh info from this turn
-    slots = update_slots(slots, text)
-
-    # 4) Decide next action
-    next_action = "reply_only"
-    tool_name = None
-
-    if intent == "outlet_query":
-        city = slots.get("city"); outlet = slots.get("outlet")
-        if not city and not outlet:
-            next_action = "ask_clarify"
-        else:
-            next_action = "use_tool"; tool_name = "outlets"
-
-    elif intent == "calc":
-        if slots.get("expr"):
-            next_action = "use_tool"; tool_name = "calculator"
-        else:
-            next_action = "ask_clarify"
-
-    elif intent == "products":
-        if slots.get("product_query"):
-            next_action = "use_tool"; tool_name = "products"
-        else:
-            next_action = "ask_clarify"
-
-    # 5) Write back
-    state["intent"] = intent
-    state["slots"] = slots
-    state["next_action"] = next_action
-    state["tool_name"] = tool_name
+    # 4) Write back
+    state["intent"] = step["intent"]
+    state["slots"] = step["slots"]
+    state["next_action"] = step["next_action"]
+    state["tool_name"] = step["tool_name"]
     return state
 
 
 #  Tool Nodes
 
-def calculator_node(state: AppState) -> AppState:
+def _session_headers(config: Optional[RunnableConfig]) -> Dict[str, str]:
+    """Forward the chat session to tool APIs so they count against the same rate limit."""
+    thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+    return {"X-Session-Id": str(thread_id)} if thread_id else {}
+
+def calculator_node(state: AppState, config: Optional[RunnableConfig] = None) -> AppState:
     expr = state["slots"].get("expr")
     try:
         if not expr:
             raise ValueError("No expression provided.")
 
         with httpx.Client(timeout=5.0) as client:
-            r = client.get(CALC_URL, params={"expr": expr})
+            r = client.get(CALC_URL, params={"expr": expr}, headers=_session_headers(config))
         if r.status_code != 200:
             try:
                 detail = r.json().get("detail")
@@ -184,13 +99,13 @@ def calculator_node(state: AppState) -> AppState:
         state["error"] = f"Calculator error: {e}"
     return state
 
-def products_node(state: AppState) -> AppState:
+def products_node(state: AppState, config: Optional[RunnableConfig] = None) -> AppState:
     q = state["slots"].get("product_query")
     try:
         if not q:
             raise ValueError("No product query provided.")
         with httpx.Client(timeout=20.0) as client:
-            r = client.get(PRODUCTS_URL, params={"query": q, "k": 5})
+            r = client.get(PRODUCTS_URL, params={"query": q, "k": 5}, headers=_session_headers(config))
         if r.status_code != 200:
             detail = r.json().get("detail", r.text)
             raise RuntimeError(f"Products API error: {detail}")
@@ -212,7 +127,7 @@ def products_node(state: AppState) -> AppState:
     return state
 
 
-def outlets_node(state: AppState) -> AppState:
+def outlets_node(state: AppState, config: Optional[RunnableConfig] = None) -> AppState:
     city = state["slots"].get("city")
     outlet = state["slots"].get("outlet")
     try:
@@ -228,7 +143,7 @@ def outlets_node(state: AppState) -> AppState:
             raise ValueError("Missing city or outlet information.")
 
         with httpx.Client(timeout=20.0) as client:
-            r = client.get(OUTLETS_URL, params={"query": query})
+            r = client.get(OUTLETS_URL, params={"query": query}, headers=_session_headers(config))
 
         if r.status_code != 200:
             detail = r.json().get("detail", r.text)
@@ -254,8 +169,61 @@ def outlets_node(state: AppState) -> AppState:
 
     return state
 
+def outlets_open_node(state: AppState, config: Optional[RunnableConfig] = None) -> AppState:
+    slots = state["slots"]
+    open_at = slots.get("open_at")
+    city = slots.get("city")
+    outlet = slots.get("outlet")
+    try:
+        if not open_at:
+            raise ValueError("Missing time to check opening hours for.")
+        params = {}
+        if open_at != "now":
+            params["at"] = open_at
+        if city:
+            params["city"] = city
+
+        with httpx.Client(timeout=20.0) as client:
+            r = client.get(OUTLETS_OPEN_URL, params=params, headers=_session_headers(config))
+
+        if r.status_code != 200:
+            detail = r.json().get("detail", r.text)
+            raise RuntimeError(f"Outlets API error: {detail}")
+
+        data = r.json()
+        if outlet:
+            data = [row for row in data if (row.get("outlet") or "").lower() == outlet.lower()]
+
+        state["tool_result"] = {
+            "type": "outlets_open",
+            "at": open_at,
+            "city": city,
+            "outlet": outlet,
+            "outlets": [
+                {
+                    "city": row.get("city"),
+                    "outlet": row.get("outlet"),
+                    "hours": f"Opens {row.get('open_time')} / Closes {row.get('close_time')}",
+                }
+                for row in data
+            ],
+        }
+        state["error"] = None
+
+    except Exception as e:
+        state["tool_result"] = None
+        state["error"] = f"Outlets error: {e}"
+
+    return state
+
 # RESPONDER NODE 
 
+# Used for small talk while the LLM is unreachable; the tool paths still work
+CANNED_REPLY = (
+    "I'm having trouble with my chat model right now, but I can still help with "
+    "calculations (e.g. 12*3), drinkware products, or outlet locations and opening hours."
+)
+
 def respond_node(state: AppState) -> AppState:
     intent = state.get("intent")
     slots = state.get("slots") or {}
@@ -264,7 +232,9 @@ def respond_node(state: AppState) -> AppState:
     tool_result = state.get("tool_result")
     error = state.get("error")
 
-    state.setdefault("messages", [])
+    # Append to a copy: the checkpoint of the previous step may still be
+    # serializing the channel's list in the background
+    state["messages"] = list(state.get("messages") or [])
 
     if next_action == "ask_clarify":
         if intent == "outlet_query":
@@ -324,26 +294,34 @@ def respond_node(state: AppState) -> AppState:
             state["messages"].append(AIMessage(content=text))
             return state
 
+        if tool_name == "outlets_open" and tool_result:
+            when = "right now" if tool_result.get("at") == "now" else f"at {tool_result.get('at')}"
+            where = tool_result.get("outlet") or tool_result.get("city") or "any city"
+            found = tool_result.get("outlets") or []
+            if not found:
+                if tool_result.get("outlet"):
+                    text = f"{where} is closed {when}."
+                else:
+                    text = f"No outlets in {where} are open {when}."
+            else:
+                lines = [f"- {o['outlet']} ({o['city']}): {o['hours']}" for o in found]
+                text = f"Open {when} in {where}:\n" + "\n".join(lines)
+            state["messages"].append(AIMessage(content=text))
+            return state
+
         state["messages"].append(AIMessage(content="I couldn’t use the tool just now. Could you rephrase or try again?"))
         return state
 
     if next_action == "reply_only":
-        sys_prompt = (
-            "You are a helpful ZUS Coffee assistant. Be concise. "
-            "If tool_result is present, you may reference it, otherwise do not invent facts. "
-            "Offer how you can help: calculator, products, outlets."
-        )
-        planner_context = {
+        messages = chitchat_messages({
             "intent": intent, "next_action": next_action, "tool": tool_name,
             "slots": slots, "error": error,
-        }
-        messages = [
-            SystemMessage(content=sys_prompt),
-            SystemMessage(content=f"Planner context: {json.dumps(planner_context, ensure_ascii=False)}"),
-            HumanMessage(content="How would you briefly respond to the user now?")
-        ]
-        ai_msg = llm.invoke(messages)
-        state["messages"].append(AIMessage(content=ai_msg.content.strip() or "How can I help you?"))
+        })
+        try:
+            text = llm.invoke(messages).content.strip() or "How can I help you?"
+        except LLMUnavailable:
+            text = CANNED_REPLY
+        state["messages"].append(AIMessage(content=text))
         return state
 
     state["messages"].append(AIMessage(content="How can I help you?"))
@@ -359,26 +337,31 @@ def decide_next_node(state: AppState) -> str:
         "calculator": "call_calculator",
         "products": "call_products",
         "outlets": "call_outlets",
+        "outlets_open": "call_outlets_open",
     }.get(name, "respond")    
 
 
-def build_app():
+def build_app(checkpointer: Optional[BaseCheckpointSaver] = None):
     graph = StateGraph(AppState)
 
-    graph.add_node("planner", planner_node)
-    graph.add_node("call_calculator", calculator_node)
-    graph.add_node("call_products", products_node)
-    graph.add_node("call_outlets", outlets_node)
-    graph.add_node("respond", respond_node)
+    # profiled() labels each node in per-request profiles; a no-op unless the request is profiled
+    graph.add_node("planner", profiled("node:planner", planner_node))
+    graph.add_node("call_calculator", profiled("node:call_calculator", calculator_node))
+    graph.add_node("call_products", profiled("node:call_products", products_node))
+    graph.add_node("call_outlets", profiled("node:call_outlets", outlets_node))
+    graph.add_node("call_outlets_open", profiled("node:call_outlets_open", outlets_open_node))
+    graph.add_node("respond", profiled("node:respond", respond_node))
 
     graph.set_entry_point("planner")
     graph.add_conditional_edges("planner", decide_next_node)
     graph.add_edge("call_calculator", "respond")
     graph.add_edge("call_products", "respond")
     graph.add_edge("call_outlets", "respond")
+    graph.add_edge("call_outlets_open", "respond")
     graph.add_edge("respond", END)
 
-    memory = MemorySaver()
+    # Stores message deltas plus periodic keyframes, zlib-compressed (see app/checkpoint.py)
+    memory = checkpointer if checkpointer is not None else CompactMemorySaver()
     return graph.compile(checkpointer=memory)
 
 
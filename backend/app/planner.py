@@ -0,0 +1,185 @@
+"""
+Rule-based intent detection, slot filling and next-action planning for the
+chat agent. Pure functions over text and slot dicts: no LLM, network or
+LangGraph imports, so logged turns can be replayed in bulk.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, TypedDict
+
+from backend.api.services.opening_hours import MINUTES_PER_DAY, format_time, parse_time
+
+
+class Plan(TypedDict):
+    intent: str
+    slots: Dict[str, Any]
+    next_action: str             # use_tool | ask_clarify | reply_only
+    tool_name: Optional[str]
+
+
+#INTENT & SLOTS
+
+PRODUCT_INTENT_KEYS = ["drinkware","bottle","tumbler","cup","thermos","insulated","vacuum","product","products"]
+
+OUTLET_INTENT_RE = re.compile(
+    r"\boutlet(s)?\b|\bbranch(es)?\b|\bstore(s)?\b|\blocation(s)?\b|\bopening hours?\b|\bclosing time\b|\bhours?\b"
+)
+CALC_INTENT_RE = re.compile(r"\d+\s*[-+*/]\s*\d+")
+
+OPEN_AT_RE = re.compile(
+    r"\bopen(?:ed)?\s+(?:right\s+)?(now|(at|after|past|until|till|by)\s+"
+    r"(\d{1,2}(?:[:.]\d{2})?\s*(?:[ap]\.?\s*m\.?)?))",
+)
+# "Open until 9:40pm" asks for outlets still open right up to that time
+_THROUGH_WORDS = {"until", "till"}
+
+PRODUCT_KEYWORDS = {"drinkware","bottle","tumbler","cup","thermos","insulated","vacuum"}
+PRODUCT_WORD_RE = re.compile(r"\b(drink|beverage)\b")
+
+CITY_PATTERNS = {r"\bkuala\s+lumpur\b|\bkl\b": "Kuala Lumpur",
+    r"\bpetaling\s+jaya\b|\bpj\b": "Petaling Jaya",
+    r"\bampang\b": "Ampang",}
+_CITY_RES = [(re.compile(pattern), name) for pattern, name in CITY_PATTERNS.items()]
+
+OUTLET_PATTERNS = {
+    r"\bwangsa\s+maju\b": "Wangsa Maju",
+    r"\bdamansara\s+perdana\b": "Damansara Perdana",     # Petaling Jaya
+    r"\bbandar\s+baru\s+ampang\b": "Bandar Baru Ampang", # Ampang
+}
+_OUTLET_RES = [(re.compile(pattern), name) for pattern, name in OUTLET_PATTERNS.items()]
+
+EXPR_RE = re.compile(r"(?<!\w)(-?\d+(?:\s*[-+*/]\s*-?\d+)+)(?!\w)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def detect_intent(text: str) -> str:
+    t = text.lower().strip()
+
+    if any(k in t for k in PRODUCT_INTENT_KEYS) or "drink" in t or "beverage" in t:
+        return "products"
+
+    if OUTLET_INTENT_RE.search(t):
+        return "outlet_query"
+
+    if OPEN_AT_RE.search(t):
+        return "outlet_query"
+
+    if CALC_INTENT_RE.search(t):
+        return "calc"
+
+    return "chitchat"
+
+
+def update_slots(slots: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """Extract structured details from the latest user text and merge into slots."""
+    t = text.lower()
+    new = dict(slots)
+
+    # Outlet
+    for pattern, name in _CITY_RES:
+        if pattern.search(t):
+            new["city"] = name
+            break
+
+    # If several outlets are named, the last one in OUTLET_PATTERNS wins
+    for pattern, name in _OUTLET_RES:
+        if pattern.search(t):
+            new["outlet"] = name
+
+    # "Open now" / "open at 10pm"
+    open_match = OPEN_AT_RE.search(t)
+    new.pop("open_at", None)
+    if open_match:
+        if open_match.group(1) == "now":
+            new["open_at"] = "now"
+        else:
+            try:
+                minute = parse_time(open_match.group(3))
+            except ValueError:
+                pass
+            else:
+                # Hours are half-open, so an outlet closing at T is open at T-1 but not at T
+                if open_match.group(2) in _THROUGH_WORDS:
+                    minute = (minute - 1) % MINUTES_PER_DAY
+                new["open_at"] = format_time(minute)
+
+    # Calculator expression
+    expr_match = EXPR_RE.search(t)
+    if expr_match:
+        new["expr"] = _SPACE_RE.sub("", expr_match.group(1))
+    else:
+        new.pop("expr", None)
+
+    # Product query
+    if any(k in t for k in PRODUCT_KEYWORDS) or PRODUCT_WORD_RE.search(t):
+        new["product_query"] = text.strip()
+
+    return new
+
+
+# Slots that no longer apply once the user switches to an intent
+_STALE_SLOTS = {
+    "products": ("expr", "city", "outlet"),
+    "outlet_query": ("expr", "product_query"),
+    "calc": ("product_query", "city", "outlet"),
+}
+
+
+def plan(text: str, slots: Optional[Dict[str, Any]] = None) -> Plan:
+    """Intent, updated slots and next action for one user message, given the slots so far."""
+    intent = detect_intent(text)
+    slots = dict(slots or {})
+
+    # Drop irrelevant leftovers by intent
+    for key in _STALE_SLOTS.get(intent, ()):
+        slots.pop(key, None)
+
+    # Extract fresh info from this turn
+    slots = update_slots(slots, text)
+
+    next_action = "reply_only"
+    tool_name = None
+
+    if intent == "outlet_query":
+        city = slots.get("city"); outlet = slots.get("outlet")
+        if slots.get("open_at"):
+            next_action = "use_tool"; tool_name = "outlets_open"
+        elif not city and not outlet:
+            next_action = "ask_clarify"
+        else:
+            next_action = "use_tool"; tool_name = "outlets"
+
+    elif intent == "calc":
+        if slots.get("expr"):
+            next_action = "use_tool"; tool_name = "calculator"
+        else:
+            next_action = "ask_clarify"
+
+    elif intent == "products":
+        if slots.get("product_query"):
+            next_action = "use_tool"; tool_name = "products"
+        else:
+            next_action = "ask_clarify"
+
+    return {"intent": intent, "slots": slots, "next_action": next_action, "tool_name": tool_name}
+
+
+def plan_batch(texts: Iterable[str], slots: Optional[Iterable[Optional[Dict[str, Any]]]] = None) -> List[Plan]:
+    """
+    Plan many independent messages, one plan() call each. `slots` gives the
+    slots each message starts from (default: none), e.g. as logged for that turn.
+    """
+    texts = list(texts)
+    priors = list(slots) if slots is not None else [None] * len(texts)
+    if len(priors) != len(texts):
+        raise ValueError(f"Got {len(texts)} messages but {len(priors)} slot dicts.")
+    return [plan(text, prior) for text, prior in zip(texts, priors)]
+
+
+def plan_conversation(texts: Iterable[str], slots: Optional[Dict[str, Any]] = None) -> List[Plan]:
+    """Plan consecutive messages of one conversation, carrying slots from turn to turn as the agent does."""
+    plans = []
+    for text in texts:
+        step = plan(text, slots)
+        slots = step["slots"]
+        plans.append(step)
+    return plans
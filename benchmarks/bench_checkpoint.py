@@ -0,0 +1,131 @@
+"""
+Checkpoint size, Python heap and serialization cost of long conversations,
+MemorySaver vs CompactMemorySaver.
+
+    python -m benchmarks.bench_checkpoint [--turns 50] [--conversations 5]
+
+Turns alternate between small talk (answered by a canned fake LLM) and
+outlet questions that end in a clarifying reply, so no network is used.
+"Heap MB" is what tracemalloc sees the saver holding once the conversations
+are over (stored bytes plus bookkeeping), from a separate traced run.
+"""
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from backend.app import graph_app
+from backend.app.checkpoint import CompactMemorySaver, stored_bytes
+
+MESSAGES = [
+    "hello there, how is your day going?",
+    "where are your outlets?",
+    "tell me something about your coffee culture",
+    "what are the opening hours?",
+]
+
+
+class CannedLLM:
+    def invoke(self, messages):
+        return type("Msg", (), {"content": "Happy to help! I can search drinkware, find outlets or do quick sums."})()
+
+
+class TimedSaver:
+    """Adds up the time spent in put/put_writes (serialization plus storage)."""
+
+    def __init__(self, saver):
+        self.saver = saver
+        self.seconds = 0.0
+        for name in ("put", "put_writes"):
+            setattr(saver, name, self._timed(getattr(saver, name)))
+
+    def _timed(self, fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - start
+        return wrapper
+
+
+def run(saver_cls, turns: int, conversations: int) -> dict:
+    saver = saver_cls()
+    timed = TimedSaver(saver)
+    app = graph_app.build_app(checkpointer=saver)
+
+    per_turn_bytes, per_turn_ms, read_ms = [], [], []
+    for c in range(conversations):
+        config = {"configurable": {"thread_id": f"conv-{c}"}}
+        before_bytes = 0
+        for t in range(turns):
+            before_s = timed.seconds
+            app.invoke({"messages": [HumanMessage(content=MESSAGES[t % len(MESSAGES)])]}, config=config)
+            now = stored_bytes(saver, config["configurable"]["thread_id"])
+            per_turn_bytes.append((t, now - before_bytes))
+            per_turn_ms.append((t, (timed.seconds - before_s) * 1000))
+            before_bytes = now
+        start = time.perf_counter()
+        state = app.get_state(config)
+        read_ms.append((time.perf_counter() - start) * 1000)
+        assert len(state.values["messages"]) == 2 * turns
+
+    last = [b for t, b in per_turn_bytes if t == turns - 1]
+    return {
+        "saver": saver_cls.__name__,
+        "total_kb": stored_bytes(saver) / 1024 / conversations,
+        "mean_turn_kb": statistics.mean(b for _, b in per_turn_bytes) / 1024,
+        "last_turn_kb": statistics.mean(last) / 1024,
+        "write_ms_turn": statistics.mean(ms for _, ms in per_turn_ms),
+        "write_ms_last": statistics.mean(ms for t, ms in per_turn_ms if t == turns - 1),
+        "read_ms": statistics.mean(read_ms),
+    }
+
+
+def heap_mb(saver_cls, turns: int, conversations: int) -> float:
+    """Python memory the saver still holds after all conversations ran."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        saver = saver_cls()
+        app = graph_app.build_app(checkpointer=saver)
+        for c in range(conversations):
+            config = {"configurable": {"thread_id": f"conv-{c}"}}
+            for t in range(turns):
+                app.invoke({"messages": [HumanMessage(content=MESSAGES[t % len(MESSAGES)])]}, config=config)
+        del app
+        gc.collect()
+        held, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del saver
+    return (held - base) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--conversations", type=int, default=5)
+    args = parser.parse_args()
+
+    graph_app.llm = CannedLLM()
+    results = [
+        dict(run(cls, args.turns, args.conversations), heap_mb=heap_mb(cls, args.turns, args.conversations))
+        for cls in (MemorySaver, CompactMemorySaver)
+    ]
+
+    print(f"{args.conversations} conversations x {args.turns} turns (per conversation)")
+    print(f"{'saver':<20}{'total KB':>10}{'KB/turn':>10}{'KB last':>10}{'heap MB':>10}"
+          f"{'ms/turn':>10}{'ms last':>10}{'read ms':>10}")
+    for r in results:
+        print(f"{r['saver']:<20}{r['total_kb']:>10.1f}{r['mean_turn_kb']:>10.2f}{r['last_turn_kb']:>10.2f}"
+              f"{r['heap_mb']:>10.2f}{r['write_ms_turn']:>10.3f}{r['write_ms_last']:>10.3f}{r['read_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
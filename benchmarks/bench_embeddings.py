@@ -0,0 +1,86 @@
+"""
+Query latency and recall of the embedding backends on the drinkware catalogue.
+
+    python -m benchmarks.bench_embeddings [--k 5] [--repeat 20]
+
+The remote (OpenAI) backend is only measured when OPENAI_API_KEY is set.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+from langchain_community.vectorstores import FAISS
+
+from backend.api.ingest.rag import build_chunks, load_rows
+from backend.api.services.embeddings import get_embeddings
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "product_queries.jsonl"
+
+
+def load_queries(path: Path = FIXTURES) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def run_backend(name: str, chunks, queries, k: int, repeat: int) -> dict:
+    embeddings = get_embeddings(name)
+
+    start = time.perf_counter()
+    vectordb = FAISS.from_documents(chunks, embedding=embeddings)
+    build_s = time.perf_counter() - start
+
+    latencies, hits, top_titles = [], 0, {}
+    for q in queries:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            docs = vectordb.similarity_search(q["query"], k=k)
+            latencies.append(time.perf_counter() - start)
+        titles = [d.metadata.get("title") or "" for d in docs]
+        top_titles[q["query"]] = titles
+        if any(rel.lower() in t.lower() for t in titles for rel in q["relevant"]):
+            hits += 1
+
+    latencies.sort()
+    return {
+        "backend": name,
+        "build_s": build_s,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "recall": hits / len(queries),
+        "top_titles": top_titles,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20, help="timed repetitions per query (remote: 1)")
+    args = parser.parse_args()
+
+    chunks = build_chunks(load_rows())
+    queries = load_queries()
+
+    results = [run_backend("hashing", chunks, queries, args.k, args.repeat)]
+    if os.getenv("OPENAI_API_KEY"):
+        results.append(run_backend("openai", chunks, queries, args.k, 1))
+    else:
+        print("OPENAI_API_KEY not set; skipping the remote backend.\n")
+
+    print(f"{len(queries)} queries, {len(chunks)} chunks, recall@{args.k}")
+    print(f"{'backend':<10}{'build s':>10}{'p50 ms':>10}{'p95 ms':>10}{'recall':>10}")
+    for r in results:
+        print(f"{r['backend']:<10}{r['build_s']:>10.3f}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['recall']:>10.2f}")
+
+    if len(results) == 2:
+        local, remote = results[0]["top_titles"], results[1]["top_titles"]
+        overlap = [
+            len(set(local[q]) & set(remote[q])) / max(1, len(set(remote[q])))
+            for q in remote
+        ]
+        print(f"\nTop-{args.k} overlap of hashing vs openai: {statistics.mean(overlap):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Throughput of POST /products/batch against the same queries sent one by one
+to GET /products, on the drinkware catalogue with the hashing backend.
+
+    python -m benchmarks.bench_product_batch [--queries 200] [--k 5] [--repeat 5]
+
+Handlers are called in-process (no HTTP), so the numbers compare the search
+paths themselves: per-query embedding + search + hydration versus one
+batched embedding, one FAISS search per distinct filter and bulk hydration.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from itertools import cycle, islice
+from pathlib import Path
+
+from langchain_community.vectorstores import FAISS
+
+from backend.api.ingest.rag import build_chunks, load_rows, save_version
+from backend.api.routers import products as products_router
+from backend.api.services.embeddings import HashingEmbeddings
+from backend.api.services.vector_index import VersionedIndex
+from benchmarks.bench_embeddings import load_queries
+
+
+def _setup(root: Path):
+    embeddings = HashingEmbeddings()
+    save_version(FAISS.from_documents(build_chunks(load_rows()), embedding=embeddings), root=root)
+    products_router._embeddings = embeddings
+    products_router._get_llm = lambda: None
+    products_router._index = VersionedIndex(root, legacy_dir=None, loader=products_router._open_index)
+    products_router._index.current()
+
+
+def run_single(queries, k: int):
+    return [products_router.products(query=q, k=k, cursor=None, format="json") for q in queries]
+
+
+def run_batch(queries, k: int):
+    return products_router.products_batch(products_router.ProductBatchRequest(queries=queries, k=k)).results
+
+
+def _time(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200, help="queries per run (fixture queries, cycled)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    queries = list(islice(cycle(q["query"] for q in load_queries()), args.queries))
+    with tempfile.TemporaryDirectory() as tmp:
+        _setup(Path(tmp))
+
+        single, batch = run_single(queries, args.k), run_batch(queries, args.k)
+        same = all(s.model_dump() == b.model_dump() for s, b in zip(single, batch))
+
+        single_s = _time(lambda: run_single(queries, args.k), args.repeat)
+        batch_s = _time(lambda: run_batch(queries, args.k), args.repeat)
+
+    print(f"{len(queries)} queries, k={args.k}, median of {args.repeat} runs; identical results: {same}")
+    print(f"{'mode':<8}{'total ms':>12}{'queries/s':>12}")
+    for name, seconds in (("single", single_s), ("batch", batch_s)):
+        print(f"{name:<8}{seconds * 1000:>12.1f}{len(queries) / seconds:>12.0f}")
+    print(f"\nSpeedup: {single_s / batch_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Prompt size and latency of the outlets, products and chitchat LLM calls,
+before and after prompt compaction, against a fake LLM that charges a
+fixed latency per prompt token and per completion token.
+
+    python -m benchmarks.bench_prompts [--requests 40] [--prompt-ms 0.3] [--completion-ms 2] [--completion-tokens 30]
+
+"legacy" rebuilds the old f-string prompts; "compact" uses the fixed system
+prefixes in backend.api.services.prompts with the product candidates capped
+at PRODUCT_CONTEXT_TOKENS. Calls go through GuardedLLM, so the token counts
+printed at the end come from the per-route accounting.
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from itertools import cycle, islice
+from pathlib import Path
+
+from backend.api.routers import products as products_router
+from backend.api.services import llm as llm_service
+from backend.api.services.llm import GuardedLLM
+from backend.api.services.prompts import (
+    chitchat_messages, count_tokens, input_text, outlets_sql_messages, products_summary_messages,
+)
+from benchmarks.bench_embeddings import load_queries
+from benchmarks.bench_product_batch import _setup
+
+OUTLET_QUERIES = [
+    "outlets in Petaling Jaya", "is there a ZUS in SS2?", "list all outlets in Kuala Lumpur",
+    "opening hours for ZUS Coffee Bangsar", "where can I find ZUS in Shah Alam",
+]
+PLANNER_CONTEXTS = [
+    {"intent": "smalltalk", "next_action": "reply_only", "tool": None, "slots": {}, "error": None},
+    {"intent": "smalltalk", "next_action": "reply_only", "tool": None, "slots": {"city": "Petaling Jaya"}, "error": None},
+    {"intent": "unknown", "next_action": "reply_only", "tool": None, "slots": {"products_query": "tumbler"}, "error": None},
+]
+
+
+def legacy_outlets_prompt(query: str) -> str:
+    return f"""
+    Given this schema:
+    CREATE TABLE outlets(city TEXT, outlet TEXT, open_time TEXT, close_time TEXT, latitude REAL, longitude REAL);
+
+    Write ONE SQL SELECT that returns EXACTLY these columns:
+    city, outlet, open_time, close_time
+    FROM the outlets table only.
+    You may add a WHERE clause on city and/or outlet if present in the user query.
+    Do NOT use JOIN, PRAGMA, ATTACH, INSERT, UPDATE, DELETE, DROP, ALTER, UNION or comments.
+    Return ONLY the SQL.
+    User query: {query}
+    """
+
+
+def legacy_products_prompt(query: str, hits) -> str:
+    context_lines = []
+    for h in hits:
+        price = f"RM{h.price_rm:,.2f}" if isinstance(h.price_rm, (int, float)) else "N/A"
+        context_lines.append(f"- {h.title} ({price}) — {h.url}")
+    return (
+        "Summarize the most relevant ZUS drinkware for the user's need.\n"
+        f"User query: {query}\n"
+        "Candidates:\n" + "\n".join(context_lines) + "\n\n"
+        "Return 2–4 concise bullets focusing on what to choose and why "
+        "(capacity, insulation, leak-proof, special lids, price hints)."
+    )
+
+
+def legacy_chitchat_prompt(planner_context: dict) -> str:
+    # The old call sent three messages; their text is what the model is charged for
+    return "\n".join([
+        "You are a helpful ZUS Coffee assistant. Be concise. "
+        "If tool_result is present, you may reference it, otherwise do not invent facts. "
+        "Offer how you can help: calculator, products, outlets.",
+        f"Planner context: {json.dumps(planner_context, ensure_ascii=False)}",
+        "How would you briefly respond to the user now?",
+    ])
+
+
+class TokenCostLLM:
+    """Sleeps for prompt_ms per prompt token plus completion_ms per completion token."""
+
+    def __init__(self, prompt_ms: float, completion_ms: float, completion_tokens: int):
+        self.prompt_ms = prompt_ms
+        self.completion_ms = completion_ms
+        self.completion = " ".join(["word"] * completion_tokens)
+
+    def invoke(self, input):
+        tokens = count_tokens(input_text(input))
+        time.sleep((tokens * self.prompt_ms + count_tokens(self.completion) * self.completion_ms) / 1000.0)
+        return type("Msg", (), {"content": self.completion})()
+
+
+def _hits(queries, k: int = 10):
+    with tempfile.TemporaryDirectory() as tmp:
+        _setup(Path(tmp))
+        return {q: products_router.products(query=q, k=k, cursor=None, format="json").hits for q in queries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40, help="calls per route and mode")
+    parser.add_argument("--prompt-ms", type=float, default=0.3, help="simulated latency per prompt token")
+    parser.add_argument("--completion-ms", type=float, default=2.0, help="simulated latency per completion token")
+    parser.add_argument("--completion-tokens", type=int, default=30)
+    args = parser.parse_args()
+
+    product_queries = [q["query"] for q in load_queries()]
+    hits = _hits(product_queries)
+    inputs = {
+        "outlets_sql": (OUTLET_QUERIES, legacy_outlets_prompt, outlets_sql_messages),
+        "products_summary": (
+            product_queries,
+            lambda q: legacy_products_prompt(q, hits[q]),
+            lambda q: products_summary_messages(q, hits[q]),
+        ),
+        "chitchat": (PLANNER_CONTEXTS, legacy_chitchat_prompt, chitchat_messages),
+    }
+
+    llm_service.reset_token_usage()
+    fake = TokenCostLLM(args.prompt_ms, args.completion_ms, args.completion_tokens)
+    latency = {}
+    for route, (items, legacy, compact) in inputs.items():
+        for mode, build in (("legacy", legacy), ("compact", compact)):
+            guarded = GuardedLLM(lambda: fake, model="fake", route=f"{route}:{mode}", hedge_after=60)
+            timings = []
+            for item in islice(cycle(items), args.requests):
+                prompt = build(item)
+                start = time.perf_counter()
+                guarded.invoke(prompt)
+                timings.append(time.perf_counter() - start)
+            latency[(route, mode)] = statistics.mean(timings) * 1000
+
+    usage = llm_service.token_usage()
+    print(f"{args.requests} calls per route; {args.prompt_ms} ms/prompt token, "
+          f"{args.completion_ms} ms/completion token, {args.completion_tokens} completion tokens\n")
+    print(f"{'route':<18}{'mode':<9}{'prompt tok':>11}{'mean ms':>10}")
+    for route in inputs:
+        for mode in ("legacy", "compact"):
+            u = usage[f"{route}:{mode}"]
+            print(f"{route:<18}{mode:<9}{u['prompt_tokens'] / u['calls']:>11.1f}{latency[(route, mode)]:>10.1f}")
+        saved = 1 - latency[(route, "compact")] / latency[(route, "legacy")]
+        print(f"{'':<18}{'saved':<9}{'':>11}{saved:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
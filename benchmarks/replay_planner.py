@@ -0,0 +1,109 @@
+"""
+Replay logged user turns through the rule-based planner and score it.
+
+    python -m benchmarks.replay_planner [corpus.jsonl] [--workers N] [--repeat 1] [--errors 10]
+
+Each corpus line is one turn:
+
+    {"text": "Is SS2 open now?", "slots": {"city": "Petaling Jaya"},
+     "intent": "outlet_query", "expected_slots": {"outlet": "SS2", "open_at": "now"},
+     "next_action": "use_tool"}
+
+`slots` (optional) are the slots the turn started from. The labels are
+optional too; each accuracy is computed over the turns that have its label.
+A turn's slots are correct when the predicted planner slots equal
+`expected_slots` exactly. Turns are planned by backend.app.planner across all
+cores, with no LLM or network involved; --repeat replays the corpus several
+times for a steadier messages/sec.
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+from backend.app.planner import plan_batch
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "planner_turns.jsonl"
+SLOT_KEYS = ("city", "outlet", "open_at", "expr", "product_query")
+
+
+def load_turns(path: Path = FIXTURES) -> List[dict]:
+    return [json.loads(line) for line in Path(path).read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def score_chunk(turns: List[dict], max_errors: int = 0) -> Tuple[Counter, List[dict]]:
+    """Plan a chunk of turns and tally hits per label; also return up to `max_errors` misses."""
+    plans = plan_batch([t["text"] for t in turns], [t.get("slots") for t in turns])
+    tally, errors = Counter(), []
+    for turn, got in zip(turns, plans):
+        tally["turns"] += 1
+        slots = {k: got["slots"][k] for k in SLOT_KEYS if k in got["slots"]}
+        checks = {
+            "intent": (turn.get("intent"), got["intent"]),
+            "slots": (turn.get("expected_slots"), slots),
+            "next_action": (turn.get("next_action"), got["next_action"]),
+        }
+        missed = {}
+        for label, (expected, predicted) in checks.items():
+            if expected is None:
+                continue
+            tally[f"{label}_total"] += 1
+            if expected == predicted:
+                tally[f"{label}_correct"] += 1
+            else:
+                missed[label] = {"expected": expected, "got": predicted}
+        if missed and len(errors) < max_errors:
+            errors.append({"text": turn["text"], **missed})
+    return tally, errors
+
+
+def _score(args):
+    return score_chunk(*args)
+
+
+def replay(turns: List[dict], workers: int = 0, max_errors: int = 10) -> Tuple[Counter, List[dict], float]:
+    """Score every turn across `workers` processes (all cores by default). Returns (tally, errors, seconds)."""
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers == 1:
+        tally, errors = score_chunk(turns, max_errors)
+    else:
+        size = max(1, -(-len(turns) // (workers * 4)))
+        chunks = [(turns[i:i + size], max_errors) for i in range(0, len(turns), size)]
+        tally, errors = Counter(), []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part, part_errors in pool.map(_score, chunks):
+                tally.update(part)
+                errors.extend(part_errors[:max_errors - len(errors)])
+    return tally, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", type=Path, default=FIXTURES)
+    parser.add_argument("--workers", type=int, default=0, help="processes (default: all cores)")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the corpus this many times")
+    parser.add_argument("--errors", type=int, default=10, help="misses to print")
+    args = parser.parse_args()
+
+    corpus = load_turns(args.corpus)
+    tally, errors, seconds = replay(corpus * args.repeat, args.workers, args.errors)
+
+    print(f"{len(corpus)} turns x {args.repeat} on {args.workers or os.cpu_count()} workers: "
+          f"{tally['turns'] / seconds:,.0f} messages/sec")
+    for label in ("intent", "slots", "next_action"):
+        total = tally[f"{label}_total"]
+        if total:
+            print(f"{label + ' accuracy':<22}{tally[f'{label}_correct'] / total:>7.1%}  ({tally[f'{label}_correct']}/{total})")
+    if errors:
+        print("\nMisses:")
+        for e in errors:
+            print(json.dumps(e, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,51 @@
+import os
+import time
+
 import pytest
 from fastapi.testclient import TestClient
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+# The suite sends many requests from one client address; keep the per-session rate limit out of the way
+os.environ.setdefault("RATE_LIMIT_PER_SECOND", "0")
 
 from backend.api.main import app
+from backend.api.ingest.rag import build_chunks, load_rows, save_version
+from backend.api.services.embeddings import HashingEmbeddings
+from backend.api.services.vector_index import VersionedIndex
+
+
+class FakeMessage:
+    """The part of a chat model reply the app reads."""
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+class CannedLLM:
+    """Chat model stand-in: counts calls and answers `content`, after `delay` seconds."""
+
+    def __init__(self, content: str = "Happy to help with drinkware, outlets or sums.", delay: float = 0.0):
+        self.content = content
+        self.delay = delay
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return FakeMessage(self.content)
+
+
+class NoEmbeddings(Embeddings):
+    """For indexes that are only loaded or searched by vector, never embedded."""
+
+    def embed_documents(self, texts):
+        raise NotImplementedError
+
+    def embed_query(self, text):
+        raise NotImplementedError
+
 
 @pytest.fixture(scope="session")
 def client():
@@ -9,4 +53,47 @@ def client():
     Shared TestClient for all test.
     """
 
-    return TestClient(app)
\ No newline at end of file
+    return TestClient(app)
+
+@pytest.fixture
+def admin_headers(monkeypatch):
+    """
+    Configure an admin token and return the headers that carry it.
+    """
+    from backend.api.routers import admin
+
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "test-admin-token")
+    return {"X-Admin-Token": "test-admin-token"}
+
+
+@pytest.fixture
+def profiling_headers(monkeypatch):
+    """
+    Configure a profiling token and return the headers that carry it to the profiling routes.
+    """
+    from backend.api.services import profiling
+
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "test-profiling-token")
+    return {"X-Profiling-Token": "test-profiling-token"}
+
+
+@pytest.fixture
+def product_index(monkeypatch, tmp_path):
+    """
+    Build the sample product index into a fresh versioned root and point
+    /products at it, with no summary LLM. Call with the embeddings to use
+    (HashingEmbeddings by default); returns the VersionedIndex.
+    """
+    from backend.api.routers import products as products_router
+
+    def build(embeddings=None):
+        embeddings = embeddings or HashingEmbeddings()
+        save_version(FAISS.from_documents(build_chunks(load_rows()), embedding=embeddings), root=tmp_path)
+        monkeypatch.setattr(products_router, "_embeddings", embeddings)
+        monkeypatch.setattr(products_router, "_llm", None)
+        monkeypatch.setattr(products_router, "_get_llm", lambda: None)
+        index = VersionedIndex(tmp_path, legacy_dir=None, loader=products_router._open_index)
+        monkeypatch.setattr(products_router, "_index", index)
+        return index
+
+    return build
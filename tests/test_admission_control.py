@@ -0,0 +1,120 @@
+import asyncio
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.api.ingest.outlets_db import build_db
+from backend.api.main import create_app
+from backend.api.services.admission import DEFAULT_LIMITS, AdmissionConfig, RouteLimit, _session_key
+from tests.conftest import CannedLLM
+
+_query_ids = itertools.count()
+
+
+@pytest.fixture
+def slow_outlets(monkeypatch, tmp_path):
+    from backend.api.routers import outlets as outlets_router
+
+    db = tmp_path / "outlets.db"
+    build_db([{"city": "Kuala Lumpur", "outlet": "Cheras", "open_time": "7:00 AM", "close_time": "11:00 PM"}], db)
+    monkeypatch.setattr(outlets_router, "DB_PATH", db)
+    # An OpenAI client that has started taking half a second per call
+    monkeypatch.setattr(outlets_router, "LLM", CannedLLM("SELECT city, outlet, open_time, close_time FROM outlets", delay=0.5))
+    outlets_router._generate_sql.cache_clear()
+    yield
+    outlets_router._generate_sql.cache_clear()
+
+
+def _app(rate_per_second=0.0, burst=20, **limits):
+    merged = dict(DEFAULT_LIMITS)
+    merged.update(limits)
+    return create_app(AdmissionConfig(limits=merged, rate_per_second=rate_per_second, burst=burst))
+
+
+def _outlets_query():
+    # Unique text so the Text2SQL cache never short-circuits the slow LLM
+    return {"query": f"outlets in Kuala Lumpur #{next(_query_ids)}"}
+
+
+def test_overflow_is_shed_and_cheap_routes_keep_capacity(slow_outlets):
+    app = _app(outlets=RouteLimit(2, 2, 5.0))
+    with TestClient(app) as client, ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(client.get, "/api/v1/outlets", params=_outlets_query()) for _ in range(8)]
+        time.sleep(0.1)
+
+        start = time.perf_counter()
+        calc = client.get("/api/v1/calculator", params={"expr": "2+3"})
+        calc_latency = time.perf_counter() - start
+
+        responses = [f.result() for f in futures]
+
+    assert calc.status_code == 200 and calc.json()["result"] == 5
+    assert calc_latency < 0.3
+
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [200] * 4 + [503] * 4
+    for r in responses:
+        if r.status_code == 503:
+            assert int(r.headers["Retry-After"]) >= 1
+            assert "try again" in r.json()["detail"]
+
+
+def test_queued_requests_give_up_after_max_wait(slow_outlets):
+    app = _app(outlets=RouteLimit(1, 5, 0.1))
+    with TestClient(app) as client, ThreadPoolExecutor(3) as pool:
+        start = time.perf_counter()
+        futures = [pool.submit(client.get, "/api/v1/outlets", params=_outlets_query()) for _ in range(3)]
+        responses = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+
+    assert sorted(r.status_code for r in responses) == [200, 503, 503]
+    assert elapsed < 1.0
+
+
+def test_per_session_token_bucket():
+    app = _app(rate_per_second=1.0, burst=2)
+    with TestClient(app) as client:
+        alice = {"X-Session-Id": "alice"}
+        codes = [client.get("/api/v1/calculator", params={"expr": "1+1"}, headers=alice).status_code for _ in range(3)]
+        assert codes == [200, 200, 429]
+
+        limited = client.get("/api/v1/calculator", params={"expr": "1+1"}, headers=alice)
+        assert limited.status_code == 429 and int(limited.headers["Retry-After"]) >= 1
+
+        bob = client.get("/api/v1/calculator", params={"expr": "1+1"}, headers={"X-Session-Id": "bob"})
+        assert bob.status_code == 200
+
+
+def test_session_key_reads_chat_body_and_replays_it():
+    body = b'{"session_id": "demo-user", "message": "hi"}'
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("10.0.0.1", 1234),
+    }
+    messages = [{"type": "http.request", "body": body[:10], "more_body": True},
+                {"type": "http.request", "body": body[10:], "more_body": False}]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def run():
+        key, replay = await _session_key(scope, receive)
+        return key, await replay()
+
+    key, replayed = asyncio.run(run())
+    assert key == "s:demo-user"
+    assert replayed["body"] == body and replayed["more_body"] is False
+
+
+def test_group_matching_prefers_longest_prefix():
+    config = AdmissionConfig()
+    assert config.group_for("/api/v1/outlets") == "outlets"
+    assert config.group_for("/api/v1/outlets/open") == "lookup"
+    assert config.group_for("/api/v1/products/batch") == "products"
+    assert config.group_for("/api/v1/outletsx") is None
+    assert config.group_for("/docs") is None
@@ -0,0 +1,106 @@
+from langchain_core.messages import HumanMessage, RemoveMessage
+from langgraph.checkpoint.memory import MemorySaver
+import pytest
+
+from backend.app import graph_app
+from backend.app.checkpoint import CompactMemorySaver, stored_bytes
+from tests.conftest import CannedLLM
+
+TURNS = ["hello there", "where are your outlets?", "tell me a fun fact", "what are the opening hours?"]
+
+
+@pytest.fixture(autouse=True)
+def canned_llm(monkeypatch):
+    monkeypatch.setattr(graph_app, "llm", CannedLLM())
+
+
+def _converse(saver, turns, thread="t"):
+    app = graph_app.build_app(checkpointer=saver)
+    config = {"configurable": {"thread_id": thread}}
+    sizes = []
+    for i in range(turns):
+        app.invoke({"messages": [HumanMessage(content=TURNS[i % len(TURNS)])]}, config=config)
+        sizes.append(stored_bytes(saver, thread))
+    return app, config, sizes
+
+
+def _dump(messages):
+    return [(type(m).__name__, m.content, m.id) for m in messages]
+
+
+def test_state_and_history_match_memory_saver():
+    plain_app, plain_cfg, _ = _converse(MemorySaver(), 20)
+    compact_app, compact_cfg, _ = _converse(CompactMemorySaver(keyframe_interval=4), 20)
+
+    plain, compact = plain_app.get_state(plain_cfg).values, compact_app.get_state(compact_cfg).values
+    assert len(compact["messages"]) == 40
+    assert [(type(m).__name__, m.content) for m in compact["messages"]] == \
+           [(type(m).__name__, m.content) for m in plain["messages"]]
+    assert compact["slots"] == plain["slots"] and compact["intent"] == plain["intent"]
+
+    plain_history = list(plain_app.get_state_history(plain_cfg))
+    compact_history = list(compact_app.get_state_history(compact_cfg))
+    assert len(plain_history) == len(compact_history)
+    for p, c in zip(plain_history, compact_history):
+        assert [m.content for m in p.values.get("messages", [])] == [m.content for m in c.values.get("messages", [])]
+
+
+def test_bytes_per_turn_stay_flat():
+    _, _, plain = _converse(MemorySaver(), 30)
+    _, _, compact = _converse(CompactMemorySaver(), 30)
+
+    plain_growth = [b - a for a, b in zip(plain, plain[1:])]
+    compact_growth = [b - a for a, b in zip(compact, compact[1:])]
+    # MemorySaver re-stores the whole history every step; deltas do not grow with it
+    assert plain_growth[-1] > 3 * plain_growth[0]
+    assert compact_growth[-1] < 2 * compact_growth[0]
+    assert compact[-1] < plain[-1] / 5
+
+
+def test_keyframes_bound_delta_chains():
+    saver = CompactMemorySaver(keyframe_interval=3)
+    _converse(saver, 12)
+    kinds = [entry[0].split("+")[0] for key, entry in saver.blobs.items() if key[2] == "messages"]
+    assert kinds.count("delta") > 0 and len(kinds) - kinds.count("delta") >= len(kinds) // 4
+
+    for key, entry in saver.blobs.items():
+        depth = 0
+        while entry[0].startswith("delta+"):
+            base, _ = saver.serde.loads_typed((entry[0][len("delta+"):], entry[1]))
+            entry = saver.blobs[key[:3] + (base,)]
+            depth += 1
+        assert depth <= 3
+
+
+def test_non_append_update_is_stored_as_keyframe():
+    saver = CompactMemorySaver()
+    app, config, _ = _converse(saver, 3)
+    first = app.get_state(config).values["messages"][0]
+    app.update_state(config, {"messages": [RemoveMessage(id=first.id)]})
+
+    messages = app.get_state(config).values["messages"]
+    assert len(messages) == 5 and first.id not in {m.id for m in messages}
+    app.invoke({"messages": [HumanMessage(content="hello again")]}, config=config)
+    assert len(app.get_state(config).values["messages"]) == 7
+
+
+
+def test_heads_keep_no_message_copies():
+    saver = CompactMemorySaver()
+    _converse(saver, 6)
+    heads = list(saver._heads.values())
+    assert heads and all(not isinstance(v, list) for h in heads for v in vars(h).values())
+    assert {h.length for h in heads} == {12}
+
+def test_pending_writes_decode_to_full_values():
+    def writes(saver):
+        _converse(saver, 4)
+        return [
+            [(channel, _dump(value) if channel == "messages" else value) for _, channel, value in t.pending_writes]
+            for t in saver.list({"configurable": {"thread_id": "t"}})
+        ]
+
+    plain, compact = writes(MemorySaver()), writes(CompactMemorySaver())
+    strip_ids = lambda ws: [[(c, [m[:2] for m in v] if c == "messages" else v) for c, v in w] for w in ws]
+    assert any(w for w in compact)
+    assert strip_ids(compact) == strip_ids(plain)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+
+from backend.api.ingest.rag import build_chunks, load_rows, save_version
+from backend.api.services.embeddings import (
+    EmbeddingMismatchError,
+    HashingEmbeddings,
+    check_embedding_meta,
+    embedding_spec,
+    get_embeddings,
+    read_embedding_meta,
+)
+from backend.api.services.vector_index import VersionedIndex
+
+
+def test_hashing_embeddings_are_deterministic_and_normalised():
+    a, b = HashingEmbeddings(dim=256), HashingEmbeddings(dim=256)
+    texts = ["Leak-proof tumbler 500ml", "OG Ceramic Mug", ""]
+
+    batch = a.encode(texts)
+    assert batch.shape == (3, 256)
+    assert batch.dtype == np.float32
+    np.testing.assert_allclose(batch, b.encode(texts))
+    np.testing.assert_allclose(batch[0], a.embed_query(texts[0]), rtol=1e-6)
+    assert np.linalg.norm(batch[0]) == pytest.approx(1.0, rel=1e-5)
+    assert not batch[2].any()
+
+
+def test_backend_selected_by_config(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_BACKEND", "hashing")
+    monkeypatch.setenv("HASHING_EMBEDDING_DIM", "128")
+    emb = get_embeddings()
+    assert isinstance(emb, HashingEmbeddings)
+    assert embedding_spec(emb)["dim"] == 128
+
+    with pytest.raises(ValueError):
+        get_embeddings("word2vec")
+
+
+def test_legacy_index_is_treated_as_openai(tmp_path):
+    assert read_embedding_meta(tmp_path)["backend"] == "openai"
+    with pytest.raises(EmbeddingMismatchError):
+        check_embedding_meta(tmp_path, HashingEmbeddings())
+
+
+def test_local_index_round_trip_and_mismatch(monkeypatch, tmp_path):
+    from backend.api.routers import products as products_router
+
+    chunks = build_chunks(load_rows())
+    vectordb = FAISS.from_documents(chunks, embedding=HashingEmbeddings())
+    version = save_version(vectordb, root=tmp_path)
+    assert read_embedding_meta(tmp_path / version)["backend"] == "hashing"
+
+    monkeypatch.setattr(products_router, "_embeddings", HashingEmbeddings())
+    handle = VersionedIndex(tmp_path, legacy_dir=None, loader=products_router._open_index).current()
+    docs = handle.vectordb.similarity_search("ceramic mug", k=1)
+    assert "Ceramic Mug" in docs[0].metadata["title"]
+
+    # Same backend with different parameters must be refused too
+    monkeypatch.setattr(products_router, "_embeddings", HashingEmbeddings(dim=512))
+    with pytest.raises(EmbeddingMismatchError):
+        VersionedIndex(tmp_path, legacy_dir=None, loader=products_router._open_index).current()
@@ -0,0 +1,103 @@
+import gzip
+import json
+
+import pytest
+
+from backend.api.ingest import web_scraping
+from backend.api.ingest.snapshots import SnapshotStore
+
+PAGE = """<html><body>
+<h1>{title}</h1>
+<p>A tumbler for every day.</p>
+<span>Sale price RM{price}</span>
+<div><h3>Measurements</h3><ul><li>Capacity: 500ml</li></ul></div>
+<div><h3>Materials</h3><ul><li>Stainless steel</li></ul></div>
+<img src="/cdn/{slug}.jpg" alt="{title}">
+</body></html>"""
+
+
+def _page(title, price):
+    return PAGE.format(title=title, price=price, slug=title.lower().replace(" ", "-"))
+
+
+@pytest.fixture()
+def store(tmp_path):
+    return SnapshotStore(tmp_path / "snapshots")
+
+
+def test_put_get_roundtrip_is_compressed_and_deduplicated(store):
+    html = _page("All Day Cup", "55.00")
+    a = store.put("https://shop/products/a", html, kind="product")
+    b = store.put("https://shop/products/a-copy", html, kind="product")
+
+    assert a == b
+    objects = list(store.objects.rglob("*.html.gz"))
+    assert len(objects) == 1
+    assert gzip.decompress(objects[0].read_bytes()).decode("utf-8") == html
+    assert store.get(a) == html
+    assert len(list(store.entries())) == 2
+
+
+def test_latest_keeps_newest_fetch_per_url(store):
+    store.put("https://shop/products/a", _page("Old", "10.00"), kind="product")
+    newest = store.put("https://shop/products/a", _page("New", "12.00"), kind="product")
+    store.put("https://shop/collections/drinkware", "<html></html>", kind="collection")
+
+    latest = store.latest(kind="product")
+    assert list(latest) == ["https://shop/products/a"]
+    assert latest["https://shop/products/a"]["sha256"] == newest
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_reextract_rebuilds_rows_without_network(store, tmp_path, monkeypatch, workers):
+    urls = {f"https://shop/products/p{i}": _page(f"Cup {i}", f"{40 + i}.00") for i in range(6)}
+    for url, html in urls.items():
+        store.put(url, html, kind="product")
+    expected = [web_scraping.parse_product(urls[u], u) for u in sorted(urls)]
+
+    def offline(*args, **kwargs):
+        raise AssertionError("re-extract must not touch the network")
+
+    monkeypatch.setattr(web_scraping.requests, "get", offline)
+    rows = web_scraping.reextract_from_snapshots(store, workers=workers)
+
+    assert rows == expected
+    assert rows[0]["title"] == "Cup 0" and rows[0]["price_rm"] == 40.0
+    assert rows[0]["measurements"] == ["Capacity: 500ml"]
+
+    out = tmp_path / "drinkware.jsonl"
+    web_scraping.save_jsonl(rows, out)
+    assert [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()] == expected
+
+
+def test_reextract_uses_only_the_last_crawl(store):
+    for i in range(3):
+        store.put(f"https://shop/products/p{i}", _page(f"Cup {i}", "40.00"), kind="product", crawl_id="c1")
+    # p0 was delisted before the second crawl
+    for i in (1, 2):
+        store.put(f"https://shop/products/p{i}", _page(f"New Cup {i}", "45.00"), kind="product", crawl_id="c2")
+
+    rows = web_scraping.reextract_from_snapshots(store, workers=1)
+    assert [r["title"] for r in rows] == ["New Cup 1", "New Cup 2"]
+
+
+def test_reextract_follows_the_listing_without_crawl_ids(store):
+    for slug in ("a", "b", "gone"):
+        store.put(f"{web_scraping.BASE}/products/{slug}", _page(slug.title(), "40.00"), kind="product")
+    listing = '<a href="/products/a">A</a> <a href="/products/b?variant=1">B</a>'
+    store.put(f"{web_scraping.BASE}{web_scraping.COLLECTION}", listing, kind="collection")
+
+    rows = web_scraping.reextract_from_snapshots(store, workers=1)
+    assert [r["title"] for r in rows] == ["A", "B"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_reextract_skips_pages_that_fail(store, capfd, workers):
+    for i in range(3):
+        store.put(f"https://shop/products/p{i}", _page(f"Cup {i}", "40.00"), kind="product")
+    missing = store.latest(kind="product")["https://shop/products/p1"]["sha256"]
+    store._object_path(missing).unlink()
+
+    rows = web_scraping.reextract_from_snapshots(store, workers=workers)
+    assert [r["title"] for r in rows] == ["Cup 0", "Cup 2"]
+    assert f"https://shop/products/p1 (snapshot {missing})" in capfd.readouterr().out
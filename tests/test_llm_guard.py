@@ -0,0 +1,169 @@
+import itertools
+import time
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import HumanMessage
+import pytest
+
+from backend.api.ingest.outlets_db import build_db
+from backend.api.services.llm import CircuitBreaker, GuardedLLM, LLMUnavailable
+from tests.conftest import FakeMessage
+
+_models = itertools.count()
+
+
+class FakeChat:
+    """Scripted chat client: each call sleeps for the next delay, then answers or raises."""
+
+    def __init__(self, delays=(0.0,), fail=False, content="ok"):
+        self.delays = list(delays)
+        self.fail = fail
+        self.content = content
+        self.calls = 0
+
+    def invoke(self, prompt):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        time.sleep(delay)
+        if self.fail:
+            raise ConnectionError("upstream down")
+        return FakeMessage(self.content)
+
+
+def _guarded(fake, **kwargs):
+    # A fresh model name gives every test its own breaker
+    return GuardedLLM(lambda: fake, model=f"fake-{next(_models)}", **kwargs)
+
+
+def _open_breaker(llm):
+    for _ in range(llm.breaker.failure_threshold):
+        llm.breaker.record_failure("forced open")
+    assert llm.breaker.state == CircuitBreaker.OPEN
+
+
+def test_deadline_bounds_a_slow_call():
+    llm = _guarded(FakeChat(delays=(2.0,)), deadline=0.2, hedge_after=0.1)
+    start = time.perf_counter()
+    with pytest.raises(LLMUnavailable):
+        llm.invoke("hi")
+    assert time.perf_counter() - start < 0.5
+    assert llm.breaker.snapshot()["consecutive_failures"] == 1
+
+
+def test_hedged_attempt_wins_when_first_is_slow():
+    fake = FakeChat(delays=(2.0, 0.0))
+    llm = _guarded(fake, deadline=1.0, hedge_after=0.1)
+    start = time.perf_counter()
+    assert llm.invoke("hi").content == "ok"
+    assert time.perf_counter() - start < 0.5
+    assert fake.calls == 2
+
+
+def test_failed_attempt_is_retried_once():
+    fake = FakeChat(fail=True)
+    llm = _guarded(fake, deadline=1.0, hedge_after=0.5, max_attempts=2)
+    with pytest.raises(LLMUnavailable, match="upstream down"):
+        llm.invoke("hi")
+    assert fake.calls == 2
+
+
+def test_breaker_opens_then_probes_and_closes():
+    fake = FakeChat(fail=True)
+    llm = _guarded(fake, deadline=1.0, max_attempts=1)
+    llm.breaker.reset_timeout = 0.2
+    for _ in range(llm.breaker.failure_threshold):
+        with pytest.raises(LLMUnavailable):
+            llm.invoke("hi")
+    assert llm.breaker.state == "open"
+
+    calls = fake.calls
+    with pytest.raises(LLMUnavailable, match="circuit open"):
+        llm.invoke("hi")
+    assert fake.calls == calls
+
+    time.sleep(0.25)
+    assert llm.breaker.state == "half_open"
+    fake.fail = False
+    assert llm.invoke("hi").content == "ok"
+    assert llm.breaker.state == "closed"
+
+
+def test_outlets_fall_back_to_rule_based_sql(client: TestClient, monkeypatch, tmp_path, admin_headers):
+    from backend.api.routers import outlets as outlets_router
+
+    db = tmp_path / "outlets.db"
+    build_db([
+        {"city": "Kuala Lumpur", "outlet": "Wangsa Maju", "open_time": "7:00 AM", "close_time": "10:00 PM"},
+        {"city": "Kuala Lumpur", "outlet": "Cheras", "open_time": "8:00 AM", "close_time": "11:00 PM"},
+        {"city": "Petaling Jaya", "outlet": "SS2", "open_time": "8:00 AM", "close_time": "10:00 PM"},
+    ], db)
+    fake = FakeChat()
+    llm = _guarded(fake)
+    _open_breaker(llm)
+    monkeypatch.setattr(outlets_router, "DB_PATH", db)
+    monkeypatch.setattr(outlets_router, "LLM", llm)
+    outlets_router._generate_sql.cache_clear()
+
+    rows = client.get("/api/v1/outlets", params={"query": "opening hours for wangsa maju"}).json()
+    assert [r["outlet"] for r in rows] == ["Wangsa Maju"]
+
+    rows = client.get("/api/v1/outlets", params={"query": "outlets in PJ"}).json()
+    assert [r["outlet"] for r in rows] == ["SS2"]
+
+    rows = client.get("/api/v1/outlets", params={"query": "x' OR 1=1; DROP TABLE outlets"}).json()
+    assert len(rows) == 3
+    assert fake.calls == 0
+
+    states = client.get("/api/v1/admin/llm", headers=admin_headers).json()
+    assert states[llm.endpoint]["state"] == "open"
+    assert states[llm.endpoint]["total_rejected"] == 3
+    outlets_router._generate_sql.cache_clear()
+
+
+def test_products_return_hits_without_summary(client: TestClient, monkeypatch):
+    from backend.api.routers import products as products_router
+
+    class Doc:
+        page_content = "ZUS All-Can Tumbler 600ml"
+        metadata = {"title": "All-Can Tumbler", "price_rm": 79.0, "url": "https://example.com/tumbler"}
+
+    llm = _guarded(FakeChat())
+    _open_breaker(llm)
+    monkeypatch.setattr(products_router, "_get_llm", lambda: llm)
+    monkeypatch.setattr(products_router, "_load_vectordb", lambda: object())
+    monkeypatch.setattr(products_router, "_ranked", lambda *a, **kw: iter([(0.1, 0, Doc())]))
+
+    response = client.get("/api/v1/products", params={"query": "tumbler"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["summary"] is None
+    assert data["hits"][0]["title"] == "All-Can Tumbler"
+
+
+def test_chitchat_gets_canned_reply(monkeypatch):
+    from backend.app import graph_app
+
+    llm = _guarded(FakeChat())
+    _open_breaker(llm)
+    monkeypatch.setattr(graph_app, "llm", llm)
+
+    state = graph_app.planner_node({"messages": [HumanMessage(content="hello there")], "slots": {}})
+    state = graph_app.respond_node(state)
+    assert state["messages"][-1].content == graph_app.CANNED_REPLY
+
+
+def test_admin_routes_need_the_token(client: TestClient, monkeypatch):
+    from backend.api.routers import admin
+    from backend.api.services import profiling
+
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", None)
+    assert client.get("/api/v1/admin/llm").status_code == 404
+
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "profiler")
+    assert client.get("/api/v1/admin/llm").status_code == 403
+    assert client.get("/api/v1/admin/llm/usage", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    # The profiling token does not open the LLM routes, nor the admin token the profiling ones
+    assert client.get("/api/v1/admin/llm", headers={"X-Admin-Token": "profiler"}).status_code == 403
+    assert client.get("/api/v1/admin/profiles", headers={"X-Profiling-Token": "s3cret"}).status_code == 403
+    assert client.get("/api/v1/admin/llm", headers={"X-Admin-Token": "s3cret"}).status_code == 200
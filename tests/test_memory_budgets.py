@@ -0,0 +1,244 @@
+"""
+Memory budgets per subsystem, so container limits can be set from numbers
+and growth regressions fail the build.
+
+Each subsystem is loaded with synthetic data at several scales and measured
+two ways: tracemalloc (Python objects held while the subsystem is alive, and
+still held after it is released) and anonymous RSS from
+/proc/self/smaps_rollup (which also sees C/C++ allocations such as FAISS
+vectors). The larger of the two is checked against a linear budget,
+base_mb + kb_per_unit * units, so superlinear growth fails at the larger
+scale. Override a budget with MEMORY_BUDGET_<SUBSYSTEM>="<base_mb>:<kb_per_unit>"
+(e.g. MEMORY_BUDGET_DOCSTORE_PICKLE="4:2").
+
+When MEMORY_REPORT is set, every measurement is written to that path as JSON.
+"""
+import ctypes
+import ctypes.util
+import gc
+import json
+import os
+import pickle
+import random
+import sqlite3
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+import faiss
+import numpy as np
+import pytest
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
+
+from backend.api.ingest.outlets_db import build_db
+from backend.api.services.geo import GeoIndex
+from backend.api.services.opening_hours import OpenHoursIndex
+from backend.api.services.shared_index import open_shared_index, write_shared_docstore
+from tests.conftest import CannedLLM, NoEmbeddings
+
+REPORT_PATH = os.getenv("MEMORY_REPORT")
+DIM = 256
+
+# subsystem -> (base_mb, kb_per_unit)
+DEFAULT_BUDGETS = {
+    "faiss_vectors": (4.0, DIM * 4 / 1024 * 1.25),   # raw float32 vectors plus 25%
+    "docstore_pickle": (4.0, 2.0),
+    "shared_index": (4.0, 0.1),                      # mmap: only page tables and bookkeeping are private
+    "outlets": (4.0, 1.5),
+    "sessions": (8.0, 24.0),                         # per session-turn, checkpoints included
+    "llm_clients": (4.0, 64.0),                      # per extra client; their shared HTTP pool is built in warm-up
+}
+LEAK_MB = 1.0  # Python memory a released subsystem may leave behind
+
+
+def budget(subsystem: str) -> tuple:
+    override = os.getenv(f"MEMORY_BUDGET_{subsystem.upper()}")
+    if override:
+        base, per_unit = override.split(":")
+        return float(base), float(per_unit)
+    return DEFAULT_BUDGETS[subsystem]
+
+
+def _trim():
+    """Collect garbage and hand freed malloc arenas back to the OS, so RSS deltas start clean."""
+    gc.collect()
+    libc = ctypes.util.find_library("c")
+    if libc:
+        trim = getattr(ctypes.CDLL(libc), "malloc_trim", None)
+        if trim is not None:
+            trim(0)
+
+
+def _anon_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Anonymous:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+@dataclass
+class Usage:
+    subsystem: str
+    units: int
+    heap_mb: float            # tracemalloc, held while alive
+    peak_mb: float            # tracemalloc peak while loading
+    leaked_mb: float          # tracemalloc, still held after release
+    rss_mb: Optional[float]   # anonymous RSS growth while alive
+    budget_mb: float
+
+    @property
+    def used_mb(self) -> float:
+        return max(self.heap_mb, self.rss_mb or 0.0)
+
+
+_results: list = []
+
+
+def measure(subsystem: str, units: int, load: Callable[[], object]) -> Usage:
+    # Warm-up run so imports and module-level caches (e.g. the HTTP pool shared
+    # by every ChatOpenAI client) are not counted as growth
+    obj = load()
+    del obj
+    _trim()
+
+    # RSS on an untraced run, since tracemalloc's own bookkeeping would show up in it
+    rss_before = _anon_rss_mb()
+    obj = load()
+    gc.collect()
+    rss_after = _anon_rss_mb()
+    del obj
+    _trim()
+
+    tracemalloc.start()
+    try:
+        obj = load()
+        gc.collect()
+        heap, peak = tracemalloc.get_traced_memory()
+        del obj
+        gc.collect()
+        leaked, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    base, per_unit = budget(subsystem)
+    usage = Usage(
+        subsystem=subsystem,
+        units=units,
+        heap_mb=heap / 2**20,
+        peak_mb=peak / 2**20,
+        leaked_mb=leaked / 2**20,
+        rss_mb=None if rss_before is None else max(0.0, rss_after - rss_before),
+        budget_mb=base + per_unit * units / 1024,
+    )
+    _results.append(usage)
+    return usage
+
+
+def check(usage: Usage):
+    assert usage.used_mb <= usage.budget_mb, (
+        f"{usage.subsystem} at {usage.units} units uses {usage.used_mb:.1f} MB, budget {usage.budget_mb:.1f} MB"
+    )
+    assert usage.leaked_mb <= LEAK_MB, f"{usage.subsystem} kept {usage.leaked_mb:.2f} MB after release"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def memory_report():
+    yield
+    if REPORT_PATH:
+        rows = [dict(asdict(u), used_mb=u.used_mb) for u in _results]
+        Path(REPORT_PATH).write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+def _write_index(path: Path, n: int):
+    rng = np.random.default_rng(0)
+    index = faiss.IndexFlatL2(DIM)
+    index.add(rng.random((n, DIM), dtype=np.float32))
+    docstore = InMemoryDocstore({
+        str(i): Document(
+            page_content=f"Synthetic tumbler {i}, {300 + i % 700}ml, double-wall stainless steel.",
+            metadata={"title": f"Tumbler {i}", "price_rm": float(i % 200), "url": f"https://shop/products/{i}",
+                      "capacity_ml": 300 + i % 700, "insulated": bool(i % 2)},
+        )
+        for i in range(n)
+    })
+    vectordb = FAISS(NoEmbeddings(), index, docstore, {i: str(i) for i in range(n)})
+    vectordb.save_local(path)
+    write_shared_docstore(vectordb, path)
+
+
+@pytest.mark.parametrize("products", [2_000, 20_000])
+def test_product_index_memory(tmp_path, products):
+    _write_index(tmp_path, products)
+
+    check(measure("faiss_vectors", products, lambda: faiss.read_index(str(tmp_path / "index.faiss"))))
+
+    def load_docstore():
+        with open(tmp_path / "index.pkl", "rb") as f:
+            return pickle.load(f)
+
+    check(measure("docstore_pickle", products, load_docstore))
+    check(measure("shared_index", products, lambda: open_shared_index(tmp_path, NoEmbeddings())))
+
+
+def _outlet_indexes(db: Path):
+    conn = sqlite3.connect(db)
+    conn.row_factory = sqlite3.Row
+    rows = [dict(r) for r in conn.execute("SELECT city, outlet, open_time, close_time, latitude, longitude FROM outlets")]
+    conn.close()
+    return OpenHoursIndex(rows), GeoIndex([(r["latitude"], r["longitude"]) for r in rows], rows)
+
+
+@pytest.mark.parametrize("outlets", [1_000, 10_000])
+def test_outlets_memory(tmp_path, outlets):
+    rng = random.Random(5)
+    rows = [
+        {"city": f"City {i % 40}", "outlet": f"ZUS Coffee Outlet {i:05d}", "open_time": "8:00 AM",
+         "close_time": "10:00 PM", "latitude": rng.uniform(1.3, 6.5), "longitude": rng.uniform(100.1, 104.3)}
+        for i in range(outlets)
+    ]
+    db = tmp_path / "outlets.db"
+    build_db(rows, db)
+
+    check(measure("outlets", outlets, lambda: _outlet_indexes(db)))
+
+
+@pytest.mark.parametrize("sessions,turns", [(4, 8), (8, 16)])
+def test_session_state_memory(monkeypatch, sessions, turns):
+    from backend.app import graph_app
+
+    monkeypatch.setattr(graph_app, "llm", CannedLLM("Happy to help! I can search drinkware, find outlets or do quick sums."))
+    messages = ["hello there, how is your day going?", "where are your outlets?",
+                "tell me something about your coffee culture", "what are the opening hours?"]
+
+    def run_sessions():
+        app = graph_app.build_app()
+        for s in range(sessions):
+            config = {"configurable": {"thread_id": f"mem-{s}"}}
+            for t in range(turns):
+                app.invoke({"messages": [HumanMessage(content=messages[t % len(messages)])]}, config=config)
+        return app
+
+    check(measure("sessions", sessions * turns, run_sessions))
+
+
+@pytest.mark.parametrize("clients", [1, 4])
+def test_llm_client_memory(monkeypatch, clients):
+    from backend.api.services.llm import chat_model
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-memory-test")
+
+    def build_clients():
+        models = [chat_model("gpt-4o-mini") for _ in range(clients)]
+        for model in models:
+            model.client  # built lazily; force it
+        return models
+
+    check(measure("llm_clients", clients, build_clients))
@@ -0,0 +1,73 @@
+import random
+import sqlite3
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.api.services.geo import GeoIndex, haversine_km
+
+
+def _synthetic_points(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    # Roughly the Klang Valley
+    return [(rng.uniform(2.7, 3.5), rng.uniform(101.2, 102.0)) for _ in range(n)]
+
+
+def test_geo_index_matches_brute_force():
+    points = _synthetic_points(20_000)
+    index = GeoIndex(points, list(range(len(points))))
+    rng = random.Random(11)
+
+    for _ in range(25):
+        lat, lng = rng.uniform(2.7, 3.5), rng.uniform(101.2, 102.0)
+        got = index.nearest(lat, lng, k=5)
+        expected = sorted(range(len(points)), key=lambda i: haversine_km(lat, lng, *points[i]))[:5]
+        assert [i for _, i in got] == expected
+        for dist, i in got:
+            assert abs(dist - haversine_km(lat, lng, *points[i])) < 1e-6
+
+
+def test_geo_index_query_latency():
+    points = _synthetic_points(50_000)
+    index = GeoIndex(points, list(range(len(points))))
+    queries = _synthetic_points(500, seed=3)
+
+    start = time.perf_counter()
+    for lat, lng in queries:
+        index.nearest(lat, lng, k=5)
+    per_query = (time.perf_counter() - start) / len(queries)
+    assert per_query < 1e-3
+
+
+def test_geo_index_edge_cases():
+    assert GeoIndex([], []).nearest(3.1, 101.6, k=3) == []
+    index = GeoIndex([(0.0, 179.9), (0.0, -179.9), (0.0, 170.0)], ["east", "west", "far"])
+    # Across the antimeridian the "west" point is the closest one
+    assert [p for _, p in index.nearest(0.0, -179.99, k=2)] == ["west", "east"]
+
+
+def test_outlets_nearest_endpoint(client: TestClient, monkeypatch, tmp_path):
+    from backend.api.routers import outlets as outlets_router
+
+    db = tmp_path / "outlets.db"
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE outlets(city TEXT, outlet TEXT, open_time TEXT, close_time TEXT, latitude REAL, longitude REAL)")
+    conn.executemany("INSERT INTO outlets VALUES (?, ?, ?, ?, ?, ?)", [
+        ("Kuala Lumpur", "Near", "7:00 AM", "10:00 PM", 3.150, 101.700),
+        ("Kuala Lumpur", "Far", "7:00 AM", "10:00 PM", 3.300, 101.900),
+        ("Kuala Lumpur", "Unmapped", "7:00 AM", "10:00 PM", None, None),
+    ])
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(outlets_router, "DB_PATH", db)
+    monkeypatch.setattr(outlets_router, "_geo_index", None)
+
+    response = client.get("/api/v1/outlets/nearest", params={"lat": 3.151, "lng": 101.701, "k": 5})
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["outlet"] for r in data] == ["Near", "Far"]
+    assert data[0]["distance_km"] < data[1]["distance_km"]
+
+    response = client.get("/api/v1/outlets/nearest", params={"lat": 123, "lng": 101.7})
+    assert response.status_code == 422
@@ -0,0 +1,68 @@
+from fastapi.testclient import TestClient
+from langchain_core.messages import HumanMessage
+import pytest
+
+from backend.api.services.opening_hours import OpenHoursIndex, parse_hours, parse_time
+
+
+def test_parse_time_formats():
+    assert parse_time("7:00 AM") == 7 * 60
+    assert parse_time("12:00 AM") == 0
+    assert parse_time("12:30 PM") == 12 * 60 + 30
+    assert parse_time("10pm") == 22 * 60
+    assert parse_time("22:15") == 22 * 60 + 15
+    with pytest.raises(ValueError):
+        parse_time("10")
+    with pytest.raises(ValueError):
+        parse_time("13:00 PM")
+
+
+def test_hours_crossing_midnight_are_split():
+    assert parse_hours("8:00 AM", "10:00 PM") == [(480, 1320)]
+    assert parse_hours("6:00 PM", "2:00 AM") == [(0, 120), (1080, 1440)]
+    assert parse_hours("6:00 PM", "12:00 AM") == [(1080, 1440)]
+    assert parse_hours("00:00", "00:00") == [(0, 1440)]
+
+
+def test_open_at_index_per_city():
+    rows = [
+        {"city": "Petaling Jaya", "outlet": "Late Night", "open_time": "6:00 PM", "close_time": "2:00 AM"},
+        {"city": "Petaling Jaya", "outlet": "Day", "open_time": "7:00 AM", "close_time": "10:00 PM"},
+        {"city": "Kuala Lumpur", "outlet": "Cheras", "open_time": "7:00 AM", "close_time": "11:00 PM"},
+        {"city": "Kuala Lumpur", "outlet": "Broken", "open_time": "soon", "close_time": "later"},
+    ]
+    index = OpenHoursIndex(rows)
+
+    def names(minute, city=None):
+        return sorted(r["outlet"] for r in index.open_at(minute, city))
+
+    assert names(parse_time("1:00 AM"), "petaling jaya") == ["Late Night"]
+    assert names(parse_time("9:00 PM"), "Petaling Jaya") == ["Day", "Late Night"]
+    assert names(parse_time("10:00 PM"), "Petaling Jaya") == ["Late Night"]
+    assert names(parse_time("3:00 AM")) == []
+    assert names(parse_time("10:30 PM")) == ["Cheras", "Late Night"]
+    assert names(600, "Nowhere") == []
+    assert [r["outlet"] for r in index.skipped] == ["Broken"]
+
+
+def test_outlets_open_endpoint(client: TestClient):
+    response = client.get("/api/v1/outlets/open", params={"at": "10:30pm", "city": "Petaling Jaya"})
+    assert response.status_code == 200
+    assert [r["outlet"] for r in response.json()] == ["Damansara Perdana"]
+
+    response = client.get("/api/v1/outlets/open", params={"at": "whenever"})
+    assert response.status_code == 400
+
+
+def test_planner_routes_open_at_queries():
+    from backend.app.graph_app import planner_node
+
+    state = planner_node({"messages": [HumanMessage(content="Which PJ outlets are open after 10pm?")], "slots": {}})
+    assert state["intent"] == "outlet_query"
+    assert state["tool_name"] == "outlets_open"
+    assert state["slots"]["open_at"] == "22:00"
+    assert state["slots"]["city"] == "Petaling Jaya"
+
+    state = planner_node({"messages": [HumanMessage(content="Is Wangsa Maju open now?")], "slots": {}})
+    assert state["tool_name"] == "outlets_open"
+    assert state["slots"]["open_at"] == "now"
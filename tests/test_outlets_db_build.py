@@ -0,0 +1,72 @@
+import sqlite3
+
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.api.ingest.outlets_db import build_db, read_rows
+
+ROWS = [
+    {"city": "Kuala Lumpur", "outlet": "Cheras", "open_time": "7:00 AM", "close_time": "11:00 PM"},
+    {"city": "Petaling Jaya", "outlet": "Damansara Perdana", "open_time": "7:00 AM", "close_time": "10:40 PM",
+     "latitude": 3.168, "longitude": 101.609},
+]
+
+
+def test_build_db_from_csv(tmp_path):
+    src = tmp_path / "outlets.csv"
+    src.write_text(
+        "city,outlet,open_time,close_time,latitude,longitude\n"
+        "Kuala Lumpur,Cheras,7:00 AM,11:00 PM,,\n"
+        "Petaling Jaya,Damansara Perdana,7:00 AM,10:40 PM,3.168,101.609\n",
+        encoding="utf-8",
+    )
+    db = tmp_path / "outlets.db"
+    assert build_db(read_rows(src), db) == 2
+
+    conn = sqlite3.connect(db)
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master")}
+    assert {"outlets", "idx_outlets_city", "idx_outlets_outlet", "sqlite_stat1"} <= names
+    assert conn.execute("SELECT latitude FROM outlets WHERE outlet = 'Cheras'").fetchone() == (None,)
+    conn.close()
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
+
+
+def test_build_db_rejects_bad_rows_and_keeps_old_file(tmp_path):
+    db = tmp_path / "outlets.db"
+    build_db(ROWS, db)
+    before = db.read_bytes()
+
+    with pytest.raises(ValueError):
+        build_db([{"city": "Kuala Lumpur", "outlet": "", "open_time": "7:00 AM", "close_time": "9:00 PM"}], db)
+    with pytest.raises(ValueError, match="non-text open_time"):
+        build_db([{"city": "Kuala Lumpur", "outlet": "Cheras", "open_time": 700, "close_time": "9:00 PM"}], db)
+    assert db.read_bytes() == before
+
+
+def test_swap_is_atomic_for_open_readers(tmp_path):
+    db = tmp_path / "outlets.db"
+    build_db(ROWS, db)
+    reader = sqlite3.connect(f"{db.as_uri()}?mode=ro", uri=True)
+    assert reader.execute("SELECT COUNT(*) FROM outlets").fetchone() == (2,)
+
+    build_db(ROWS[:1], db)
+    # The old connection still sees the complete old file; a new one sees the new file
+    assert reader.execute("SELECT COUNT(*) FROM outlets").fetchone() == (2,)
+    assert sqlite3.connect(db).execute("SELECT COUNT(*) FROM outlets").fetchone() == (1,)
+    reader.close()
+
+
+def test_router_picks_up_rebuilt_db(client: TestClient, monkeypatch, tmp_path):
+    from backend.api.routers import outlets as outlets_router
+
+    db = tmp_path / "outlets.db"
+    build_db(ROWS, db)
+    monkeypatch.setattr(outlets_router, "DB_PATH", db)
+
+    response = client.get("/api/v1/outlets/open", params={"at": "22:50"})
+    assert [r["outlet"] for r in response.json()] == ["Cheras"]
+
+    build_db(ROWS + [{"city": "Kuala Lumpur", "outlet": "Late", "open_time": "6:00 PM", "close_time": "2:00 AM"}], db)
+
+    response = client.get("/api/v1/outlets/open", params={"at": "22:50"})
+    assert sorted(r["outlet"] for r in response.json()) == ["Cheras", "Late"]
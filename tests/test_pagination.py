@@ -0,0 +1,119 @@
+import json
+
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.api.ingest.outlets_db import build_db
+from tests.conftest import CannedLLM
+
+
+@pytest.fixture
+def outlets_db(monkeypatch, tmp_path):
+    from backend.api.routers import outlets as outlets_router
+
+    rows = [
+        {"city": "Selangor" if i % 3 else "Kuala Lumpur", "outlet": f"Outlet {i:03d}",
+         "open_time": "7:00 AM", "close_time": "10:00 PM"}
+        for i in range(120)
+    ]
+    db = tmp_path / "outlets.db"
+    build_db(rows, db)
+    llm = CannedLLM("```sql\nSELECT city, outlet, open_time, close_time FROM outlets WHERE city = 'Selangor';\n```")
+    monkeypatch.setattr(outlets_router, "DB_PATH", db)
+    monkeypatch.setattr(outlets_router, "LLM", llm)
+    outlets_router._generate_sql.cache_clear()
+    yield llm
+    outlets_router._generate_sql.cache_clear()
+
+
+def test_outlets_cursor_pages_cover_every_row_once(client: TestClient, outlets_db):
+    seen, cursor = [], None
+    while True:
+        params = {"query": "all outlets in Selangor", "limit": 25}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/outlets", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 25
+        seen.extend(r["outlet"] for r in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert len(seen) == 80 and len(set(seen)) == 80
+    # Text2SQL ran once for the whole walk
+    assert outlets_db.calls == 1
+
+    unpaged = client.get("/api/v1/outlets", params={"query": "all outlets in Selangor"})
+    assert "X-Next-Cursor" not in unpaged.headers
+    assert len(unpaged.json()) == 80
+
+
+def test_outlets_ndjson_stream(client: TestClient, outlets_db):
+    response = client.get("/api/v1/outlets", params={"query": "all outlets in Selangor", "format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 80
+    assert set(lines[0]) == {"city", "outlet", "open_time", "close_time"}
+
+    response = client.get("/api/v1/outlets", params={"query": "all outlets in Selangor", "format": "ndjson", "limit": 30})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 31 and "next_cursor" in lines[-1]
+
+    response = client.get("/api/v1/outlets", params={"query": "x", "cursor": "!!not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_outlets_llm_order_by_is_dropped(client: TestClient, outlets_db):
+    outlets_db.content = "SELECT city, outlet, open_time, close_time FROM outlets WHERE city = 'Selangor' ORDER BY outlet DESC"
+    unpaged = [r["outlet"] for r in client.get("/api/v1/outlets", params={"query": "selangor, newest first"}).json()]
+    paged = [r["outlet"] for r in client.get("/api/v1/outlets", params={"query": "selangor, newest first", "limit": 10}).json()]
+    assert unpaged == sorted(unpaged) and paged == unpaged[:10]
+
+    outlets_db.content = "SELECT city, outlet, open_time, close_time FROM outlets ORDER BY outlet DESC LIMIT 5"
+    assert [r["outlet"] for r in client.get("/api/v1/outlets", params={"query": "any five"}).json()] == \
+           [f"Outlet {i:03d}" for i in range(5)]
+
+
+@pytest.fixture
+def hashing_index(product_index):
+    return product_index().current().vectordb
+
+
+def test_products_cursor_walks_full_ranking(client: TestClient, hashing_index):
+    # No price/capacity/feature words, so the query is not pre-filtered
+    total = hashing_index.index.ntotal
+    expected = [
+        d.metadata["url"] for d, _ in hashing_index.similarity_search_with_score("tumbler with lid", k=total)
+    ]
+
+    seen, cursor = [], None
+    while True:
+        params = {"query": "tumbler with lid", "k": 4}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/api/v1/products", params=params).json()
+        seen.extend(h["url"] for h in data["hits"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == total
+    assert sorted(seen) == sorted(expected)
+    assert seen[:4] == expected[:4]
+
+
+def test_products_ndjson_stream(client: TestClient, hashing_index):
+    response = client.get("/api/v1/products", params={"query": "mug", "k": 3, "format": "ndjson"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 4
+    assert "Mug" in lines[0]["title"]
+
+    cursor = lines[-1]["next_cursor"]
+    response = client.get("/api/v1/products", params={"query": "mug", "k": 3, "cursor": cursor})
+    first_page = {(h["url"], h["chunk_preview"]) for h in lines[:3]}
+    second_page = {(h["url"], h["chunk_preview"]) for h in response.json()["hits"]}
+    assert len(second_page) == 3 and not first_page & second_page
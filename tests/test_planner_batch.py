@@ -0,0 +1,61 @@
+import subprocess
+import sys
+
+from langchain_core.messages import HumanMessage
+import pytest
+
+from backend.api.services.opening_hours import OpenHoursIndex, parse_time
+from backend.app.planner import plan, plan_batch, plan_conversation
+from benchmarks.replay_planner import load_turns, replay
+
+
+def test_plan_batch_matches_planner_node():
+    from backend.app.graph_app import planner_node
+
+    turns = load_turns()
+    plans = plan_batch([t["text"] for t in turns], [t.get("slots") for t in turns])
+    for turn, got in zip(turns, plans):
+        state = planner_node({"messages": [HumanMessage(content=turn["text"])], "slots": turn.get("slots") or {}})
+        assert got == {k: state[k] for k in ("intent", "slots", "next_action", "tool_name")}
+
+
+def test_plan_conversation_carries_slots():
+    plans = plan_conversation(["outlets in PJ", "is it open after 10pm?", "what is 2 + 3"])
+    assert plans[0]["slots"] == {"city": "Petaling Jaya"} and plans[0]["tool_name"] == "outlets"
+    assert plans[1]["slots"] == {"city": "Petaling Jaya", "open_at": "22:00"}
+    assert plans[1]["tool_name"] == "outlets_open"
+    assert plans[2]["intent"] == "calc" and plans[2]["slots"] == {"expr": "2+3"}
+
+    with pytest.raises(ValueError):
+        plan_batch(["hi", "hello"], [{}])
+
+
+def test_open_until_includes_the_closing_time():
+    step = plan("Is Wangsa Maju open until 9:40pm?")
+    assert step["slots"] == {"outlet": "Wangsa Maju", "open_at": "21:39"}
+    assert plan("any outlet open till 10pm")["slots"]["open_at"] == "21:59"
+    assert plan("any outlet open at 9:40pm")["slots"]["open_at"] == "21:40"
+
+    index = OpenHoursIndex([{"city": "Kuala Lumpur", "outlet": "Wangsa Maju",
+                             "open_time": "8:00 AM", "close_time": "9:40 PM"}])
+    assert [r["outlet"] for r in index.open_at(parse_time(step["slots"]["open_at"]))] == ["Wangsa Maju"]
+
+
+def test_planner_imports_no_llm_stack():
+    code = (
+        "import sys, backend.app.planner; "
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in ('langchain_core', 'langchain_openai', 'langgraph', 'openai', 'httpx')))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_replay_scores_the_same_on_any_number_of_workers():
+    turns = load_turns() * 3
+    single, _, _ = replay(turns, workers=1)
+    parallel, errors, _ = replay(turns, workers=2, max_errors=5)
+
+    assert single == parallel
+    assert single["turns"] == len(turns) and single["intent_total"] == len(turns)
+    assert 0 < single["intent_correct"] <= single["intent_total"]
+    assert len(errors) == 5
@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.api.services.embeddings import HashingEmbeddings
+from tests.conftest import CannedLLM
+
+QUERIES = [
+    "tumbler with lid",
+    "ceramic mug",
+    "cup under RM60 at least 600ml",
+    "insulated flask over 5 litres",
+    "mug",
+    "ceramic mug",
+]
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def encode(self, texts):
+        self.batches.append(len(texts))
+        return super().encode(texts)
+
+
+@pytest.fixture
+def batch_index(product_index):
+    embeddings = CountingEmbeddings()
+    product_index(embeddings)
+    embeddings.batches.clear()
+    return embeddings
+
+
+def test_batch_matches_single_queries(client: TestClient, batch_index):
+    response = client.post("/api/v1/products/batch", json={"queries": QUERIES, "k": 3})
+    assert response.status_code == 200
+    data = response.json()
+    # Every query was embedded in one call
+    assert batch_index.batches == [len(QUERIES)]
+
+    assert data["ok"] and data["k"] == 3 and len(data["results"]) == len(QUERIES)
+    for query, result in zip(QUERIES, data["results"]):
+        single = client.get("/api/v1/products", params={"query": query, "k": 3}).json()
+        assert result == single
+
+    assert data["results"][2]["filters"] == {"max_price": 60.0, "min_capacity_ml": 600.0}
+    assert data["results"][3]["hits"] == [] and data["results"][3]["next_cursor"] is None
+    assert data["results"][0]["next_cursor"] is not None
+
+
+def test_batch_summaries_are_opt_in(client: TestClient, batch_index, monkeypatch):
+    from backend.api.routers import products as products_router
+
+    llm = CannedLLM(" summary ")
+    monkeypatch.setattr(products_router, "_get_llm", lambda: llm)
+
+    data = client.post("/api/v1/products/batch", json={"queries": QUERIES[:2]}).json()
+    assert llm.calls == 0 and all(r["summary"] is None for r in data["results"])
+
+    data = client.post("/api/v1/products/batch", json={"queries": QUERIES, "summaries": True}).json()
+    # No summary for a query without hits
+    assert [r["summary"] for r in data["results"]] == ["summary", "summary", "summary", None, "summary", "summary"]
+    assert llm.calls == 5
+
+
+def test_batch_rejects_bad_requests(client: TestClient, batch_index):
+    response = client.post("/api/v1/products/batch", json={"queries": ["mug", "  "]})
+    assert response.status_code == 400 and response.json()["detail"] == "Query 1 cannot be empty."
+
+    assert client.post("/api/v1/products/batch", json={"queries": []}).status_code == 422
+    assert client.post("/api/v1/products/batch", json={"queries": ["mug"], "k": 11}).status_code == 422
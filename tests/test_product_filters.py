@@ -0,0 +1,91 @@
+from fastapi.testclient import TestClient
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+import numpy as np
+import pytest
+
+from backend.api.services.embeddings import HashingEmbeddings
+from backend.api.services.product_attributes import (
+    ATTRIBUTES_FILE, AttributeTable, extract_attributes, load_attribute_table, parse_constraints,
+)
+
+
+def test_parse_constraints():
+    c = parse_constraints("Leak-proof tumbler under RM100, 500ml")
+    assert c.max_price == 100 and c.min_price is None
+    assert c.min_capacity_ml == pytest.approx(450) and c.max_capacity_ml == pytest.approx(550)
+    assert c.features == {"leak_proof"}
+
+    c = parse_constraints("insulated bottle between RM50 and RM80, at least 1L")
+    assert (c.min_price, c.max_price) == (50, 80)
+    assert c.min_capacity_ml == 1000 and c.max_capacity_ml is None
+    assert c.features == {"insulated"}
+
+    assert parse_constraints("a nice tumbler").is_empty
+
+
+def test_extract_attributes_from_scraped_row():
+    row = {
+        "title": "All-Can Tumbler | 600ml",
+        "price_rm": 60.0,
+        "variants": [{"name": "Stainless Steel", "price_rm": 105.0}, {"name": "Sale", "price_rm": 89.0}],
+        "measurements": ["Volume: 600ml (20oz)", "Heat retention: >60°C (6 hours)", "Screw-On Lid: PP & Silicone"],
+        "materials": [],
+    }
+    attrs = extract_attributes(row)
+    assert attrs["capacity_ml"] == 600
+    assert (attrs["price_min_rm"], attrs["price_max_rm"]) == (89.0, 105.0)
+    assert attrs["insulated"] and attrs["leak_proof"] and attrs["stainless_steel"]
+    assert not attrs["ceramic"]
+
+    assert extract_attributes({"title": "Travel Cup", "measurements": ["12oz"], "price_rm": 30})["capacity_ml"] == 355
+
+
+def test_select_treats_unknown_values_as_non_matching():
+    table = AttributeTable.from_metadata([
+        {"capacity_ml": 500, "price_min_rm": 79.0, "price_max_rm": 85.0, "insulated": True},
+        {"capacity_ml": None, "price_min_rm": 39.0, "price_max_rm": 39.0},
+        {"capacity_ml": 470, "price_min_rm": 39.0, "price_max_rm": 39.0, "ceramic": True},
+    ])
+    assert table.select(parse_constraints("under RM50")).tolist() == [1, 2]
+    assert table.select(parse_constraints("mug 500ml under RM50")).tolist() == [2]
+    assert table.select(parse_constraints("insulated under RM80")).tolist() == [0]
+    assert table.select(parse_constraints("over 2 litres")).tolist() == []
+
+
+@pytest.fixture
+def filtered_index(product_index):
+    return product_index().current()
+
+
+def test_constrained_query_only_ranks_matching_vectors(client: TestClient, filtered_index):
+    assert (filtered_index.path / ATTRIBUTES_FILE).exists()
+
+    data = client.get("/api/v1/products", params={"query": "cup under RM60 at least 600ml", "k": 10}).json()
+    assert data["filters"] == {"max_price": 60.0, "min_capacity_ml": 600.0}
+    assert data["hits"] and {h["title"] for h in data["hits"]} == {"Frozee Cold Cup | 650ml"}
+
+    data = client.get("/api/v1/products", params={"query": "ceramic mug", "k": 10}).json()
+    assert data["hits"] and all("Ceramic" in h["title"] for h in data["hits"])
+    assert all(h["capacity_ml"] == 470 for h in data["hits"])
+
+    data = client.get("/api/v1/products", params={"query": "insulated flask over 5 litres"}).json()
+    assert data["hits"] == [] and data["ok"]
+
+    data = client.get("/api/v1/products", params={"query": "tumbler"}).json()
+    assert data["filters"] is None and len(data["hits"]) == 5
+
+
+def test_ranked_search_respects_id_selector(filtered_index):
+    from backend.api.routers import products as products_router
+
+    vectordb = filtered_index.vectordb
+    ids = np.array([3, 7, 11], dtype=np.int64)
+    ranked = list(products_router._ranked(vectordb, "stainless tumbler", depth=10, ids=ids))
+    assert sorted(pos for _, pos, _ in ranked) == [3, 7, 11]
+
+
+def test_index_without_attributes_is_unfiltered():
+    docs = [Document(page_content="Ceramic mug", metadata={"title": "Mug", "price_rm": 39.0})]
+    vectordb = FAISS.from_documents(docs, embedding=HashingEmbeddings(dim=64))
+    assert load_attribute_table(None, vectordb) is None
@@ -0,0 +1,122 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.api.ingest.rag import prune_versions
+from backend.api.services.vector_index import (
+    LEGACY_VERSION,
+    VersionedIndex,
+    publish_version,
+    read_current_version,
+)
+
+
+class FakeVectorDB:
+    def __init__(self, path):
+        self.version = path.name
+        self.closed = False
+
+
+def _publish(root, version):
+    (root / version).mkdir()
+    publish_version(root, version)
+
+
+def test_current_falls_back_to_legacy_then_follows_published_versions(tmp_path):
+    legacy = tmp_path / "data"
+    legacy.mkdir()
+    (legacy / "index.faiss").write_bytes(b"")
+    (legacy / "index.pkl").write_bytes(b"")
+    root = legacy / "index"
+    root.mkdir()
+
+    index = VersionedIndex(root, legacy_dir=legacy, loader=FakeVectorDB)
+    assert index.current().version == LEGACY_VERSION
+    assert index.refresh() is False
+
+    _publish(root, "v1")
+    assert read_current_version(root) == "v1"
+    assert index.refresh() is True
+    assert index.current().vectordb.version == "v1"
+    assert index.refresh() is False
+
+
+def test_prune_keeps_newest_versions_and_ignores_other_folders(tmp_path):
+    for name in ["20250101-120000", "20250101-120000-2", "20250101-120000-9", "20250101-120000-10",
+                 "backup", "my-notes"]:
+        (tmp_path / name).mkdir()
+    prune_versions(tmp_path, keep=2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "20250101-120000-10", "20250101-120000-9", "backup", "my-notes",
+    ]
+
+
+def test_in_flight_readers_keep_their_version(tmp_path):
+    _publish(tmp_path, "v1")
+    index = VersionedIndex(tmp_path, legacy_dir=None, loader=FakeVectorDB)
+
+    held = index.current()
+    _publish(tmp_path, "v2")
+    index.refresh()
+
+    assert held.vectordb.version == "v1"
+    assert index.current().vectordb.version == "v2"
+
+
+def test_missing_index_raises(tmp_path):
+    index = VersionedIndex(tmp_path, legacy_dir=None, loader=FakeVectorDB)
+    with pytest.raises(FileNotFoundError):
+        index.current()
+
+
+def test_watcher_swaps_without_torn_reads(tmp_path):
+    _publish(tmp_path, "v1")
+
+    def slow_loader(path):
+        time.sleep(0.05)
+        return FakeVectorDB(path)
+
+    index = VersionedIndex(tmp_path, legacy_dir=None, loader=slow_loader)
+    index.current()
+    index.start_watcher(interval=0.01)
+
+    torn = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            handle = index.current()
+            if handle.version != handle.vectordb.version:
+                torn.append(handle)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    try:
+        _publish(tmp_path, "v2")
+        deadline = time.time() + 5
+        while index.current().version != "v2" and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        index.stop_watcher()
+
+    assert index.current().version == "v2"
+    assert torn == []
+
+
+def test_products_index_endpoint(client: TestClient, monkeypatch, tmp_path):
+    from backend.api.routers import products as products_router
+
+    _publish(tmp_path, "20250101-000000")
+    monkeypatch.setattr(products_router, "_index", VersionedIndex(tmp_path, legacy_dir=None, loader=FakeVectorDB))
+
+    response = client.get("/api/v1/products/index")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["version"] == "20250101-000000"
+    assert data["load_seconds"] >= 0
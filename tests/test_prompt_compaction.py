@@ -0,0 +1,81 @@
+import itertools
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from backend.api.routers.products import ProductHit
+from backend.api.services.llm import GuardedLLM, token_usage
+from backend.api.services.prompts import (
+    CHITCHAT_SYSTEM, OUTLETS_SQL_SYSTEM, PRODUCTS_SUMMARY_SYSTEM, chitchat_messages, count_tokens,
+    outlets_sql_messages, products_summary_messages,
+)
+from tests.conftest import FakeMessage
+
+_routes = itertools.count()
+
+
+class ScriptedChat:
+    def __init__(self, reply):
+        self.reply = reply
+        self.inputs = []
+
+    def invoke(self, input):
+        self.inputs.append(input)
+        return self.reply
+
+
+def test_prompts_are_fixed_prefix_plus_variable_suffix():
+    a, b = outlets_sql_messages("outlets in PJ"), outlets_sql_messages("is SS2 open?")
+    assert isinstance(a[0], SystemMessage) and a[0].content == b[0].content == OUTLETS_SQL_SYSTEM
+    assert a[1].content == "outlets in PJ"
+
+    hits = [ProductHit(title="All-Day Cup", price_rm=55.0, capacity_ml=500, url="https://shop/products/all-day-cup")]
+    messages = products_summary_messages("a 500ml cup", hits)
+    assert messages[0].content == PRODUCTS_SUMMARY_SYSTEM
+    assert messages[1].content == "User query: a 500ml cup\nCandidates:\n- All-Day Cup (RM55.00, 500ml)"
+
+    messages = chitchat_messages({"intent": "smalltalk", "next_action": "reply_only", "tool": None, "slots": {}})
+    assert messages[0].content == CHITCHAT_SYSTEM
+    assert messages[1].content == '{"intent":"smalltalk","next_action":"reply_only"}'
+
+
+def test_product_candidates_are_capped_to_the_token_budget():
+    hits = [ProductHit(title=f"ZUS Stainless Steel Tumbler {i}", price_rm=79.0 + i, capacity_ml=600) for i in range(10)]
+    full = products_summary_messages("tumbler", hits, budget=10_000)[1].content
+    capped = products_summary_messages("tumbler", hits, budget=40)[1].content
+
+    assert full.count("\n- ") == 10
+    kept = capped.count("\n- ")
+    assert 1 <= kept < 10
+    # Best-ranked candidates are the ones kept
+    assert "Tumbler 0 " in capped and "Tumbler 9 " not in capped
+    assert sum(count_tokens(line) for line in capped.splitlines()[2:]) <= 40
+
+    # The top candidate is kept even when it alone exceeds the budget
+    assert products_summary_messages("tumbler", hits, budget=1)[1].content.count("\n- ") == 1
+
+
+def test_token_counts_are_recorded_per_route(client: TestClient, admin_headers):
+    route = f"test-route-{next(_routes)}"
+    estimated = ScriptedChat(FakeMessage("Hello! How can I help?"))
+    llm = GuardedLLM(lambda: estimated, model="fake-usage", route=route)
+    prompt = [SystemMessage(content=CHITCHAT_SYSTEM), HumanMessage(content='{"intent":"smalltalk"}')]
+    llm.invoke(prompt)
+    llm.invoke(prompt)
+
+    usage = token_usage()[route]
+    assert usage["calls"] == 2 and usage["estimated_calls"] == 2
+    assert usage["prompt_tokens"] == 2 * count_tokens(CHITCHAT_SYSTEM + "\n" + '{"intent":"smalltalk"}')
+    assert usage["completion_tokens"] == 2 * count_tokens("Hello! How can I help?")
+
+    # Provider counts win over the estimate when the response carries them
+    reported = AIMessage(content="SELECT 1", usage_metadata={
+        "input_tokens": 120, "output_tokens": 7, "total_tokens": 127, "input_token_details": {"cache_read": 96},
+    })
+    GuardedLLM(lambda: ScriptedChat(reported), model="fake-usage", route=route).invoke(prompt)
+
+    data = client.get("/api/v1/admin/llm/usage", headers=admin_headers).json()[route]
+    assert data["calls"] == 3 and data["estimated_calls"] == 2
+    assert data["prompt_tokens"] == usage["prompt_tokens"] + 120
+    assert data["completion_tokens"] == usage["completion_tokens"] + 7
+    assert data["cached_prompt_tokens"] == 96
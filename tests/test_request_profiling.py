@@ -0,0 +1,107 @@
+import threading
+
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.api.services import profiling
+from backend.api.services.llm import GuardedLLM
+from tests.conftest import CannedLLM
+
+LLM_DELAY = 0.3
+
+
+@pytest.fixture
+def sleepy_llm(monkeypatch, profiling_headers):
+    from backend.app import graph_app
+
+    monkeypatch.setattr(graph_app, "llm", GuardedLLM(lambda: CannedLLM("Hello! I can help with products, outlets and sums.", delay=LLM_DELAY), model="sleepy", deadline=5.0, hedge_after=5.0))
+
+
+def _chat(client, session, headers=None):
+    return client.post("/api/v1/chat", json={"session_id": session, "message": "hello there"}, headers=headers or {})
+
+
+def test_unprofiled_requests_leave_no_trace(client: TestClient, sleepy_llm, profiling_headers):
+    before = client.get("/api/v1/admin/profiles", headers=profiling_headers).json()
+    response = _chat(client, "plain")
+    assert response.status_code == 200
+    assert profiling.PROFILE_ID_HEADER not in response.headers
+    assert client.get("/api/v1/admin/profiles", headers=profiling_headers).json() == before
+
+
+def test_header_profiles_the_whole_turn(client: TestClient, sleepy_llm, profiling_headers):
+    response = _chat(client, "profiled", headers={"X-Profile": profiling.PROFILING_TOKEN})
+    assert response.status_code == 200
+    profile_id = response.headers[profiling.PROFILE_ID_HEADER]
+
+    collapsed = client.get(f"/api/v1/admin/profiles/{profile_id}", params={"format": "collapsed"},
+                           headers=profiling_headers).text
+    stacks = [line.rsplit(" ", 1)[0] for line in collapsed.splitlines()]
+    assert all(s.startswith("chat;") or s.startswith("llm:sleepy;") for s in stacks)
+    # The planner finishes well inside one sampling interval, so only the slow nodes are certain to show
+    assert any("node:respond" in s for s in stacks)
+    assert any(s.startswith("llm:sleepy;") and "CannedLLM.invoke" in s for s in stacks)
+
+    speedscope = client.get(f"/api/v1/admin/profiles/{profile_id}", headers=profiling_headers).json()
+    profile = speedscope["profiles"][0]
+    assert profile["type"] == "sampled" and len(profile["samples"]) == len(profile["weights"])
+    assert {f["name"] for f in speedscope["shared"]["frames"]} >= {"chat", "node:respond"}
+
+    summary = next(p for p in client.get("/api/v1/admin/profiles", headers=profiling_headers).json()
+                   if p["id"] == profile_id)
+    assert summary["duration_ms"] >= LLM_DELAY * 1000
+
+
+def test_only_the_target_request_is_sampled(client: TestClient, sleepy_llm):
+    stop = threading.Event()
+
+    def unrelated_work():
+        while not stop.is_set():
+            sum(range(1000))
+
+    busy = threading.Thread(target=unrelated_work)
+    busy.start()
+    try:
+        results = {}
+        other = threading.Thread(target=lambda: results.setdefault("other", _chat(client, "other")))
+        other.start()
+        target = _chat(client, "target", headers={"X-Profile": profiling.PROFILING_TOKEN})
+        other.join()
+    finally:
+        stop.set()
+        busy.join()
+
+    assert profiling.PROFILE_ID_HEADER not in results["other"].headers
+    profile = profiling.get_profile(target.headers[profiling.PROFILE_ID_HEADER])
+    assert "unrelated_work" not in profile.collapsed()
+    # One LLM call's worth of samples: the concurrent request's call is not counted
+    llm_ms = sum(n for stack, n in profile.samples.items() if stack.startswith("llm:")) * profile.interval_ms
+    assert 0 < llm_ms < LLM_DELAY * 1000 * 1.5
+
+
+def test_admin_can_arm_the_next_request(client: TestClient, sleepy_llm, profiling_headers):
+    assert client.post("/api/v1/admin/profiling/arm", params={"requests": 1}, headers=profiling_headers).json() == {"armed": 1}
+    first, second = _chat(client, "armed"), _chat(client, "armed")
+    assert profiling.PROFILE_ID_HEADER in first.headers
+    assert profiling.PROFILE_ID_HEADER not in second.headers
+    assert client.get("/api/v1/admin/profiles/does-not-exist", headers=profiling_headers).status_code == 404
+
+
+def test_profiling_routes_need_the_token(client: TestClient, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", None)
+    assert client.post("/api/v1/admin/profiling/arm").status_code == 404
+    assert client.get("/api/v1/admin/profiles").status_code == 404
+
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "s3cret")
+    assert client.post("/api/v1/admin/profiling/arm", headers={"X-Profiling-Token": "wrong"}).status_code == 403
+    assert client.get("/api/v1/admin/profiles").status_code == 403
+    assert profiling.armed() == 0
+
+
+def test_header_needs_the_configured_token(client: TestClient, sleepy_llm, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", None)
+    for value in ("1", "true", "on"):
+        assert profiling.PROFILE_ID_HEADER not in _chat(client, "anonymous", headers={"X-Profile": value}).headers
+
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "s3cret")
+    assert profiling.PROFILE_ID_HEADER not in _chat(client, "guess", headers={"X-Profile": "1"}).headers
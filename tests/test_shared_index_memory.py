@@ -0,0 +1,89 @@
+import multiprocessing as mp
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pytest
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from backend.api.services.shared_index import MmapDocstore, open_shared_index, write_shared_docstore
+from tests.conftest import NoEmbeddings
+
+DIM = 256
+N_VECTORS = 40_000
+N_WORKERS = 3
+
+pytestmark = pytest.mark.skipif(
+    not Path("/proc/self/smaps_rollup").exists(), reason="needs Linux /proc/self/smaps_rollup"
+)
+
+
+def _memory_mb() -> dict:
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss", "Anonymous"):
+                fields[key] = int(value.split()[0]) / 1024
+    return fields
+
+
+def _build_index(path: Path):
+    rng = np.random.default_rng(0)
+    vectors = rng.random((N_VECTORS, DIM), dtype=np.float32)
+    index = faiss.IndexFlatL2(DIM)
+    index.add(vectors)
+    ids = {i: f"doc-{i}" for i in range(N_VECTORS)}
+    docstore = InMemoryDocstore({
+        f"doc-{i}": Document(page_content=f"Synthetic tumbler {i}", metadata={"title": f"Tumbler {i}", "price_rm": float(i % 200)})
+        for i in range(N_VECTORS)
+    })
+    vectordb = FAISS(NoEmbeddings(), index, docstore, ids)
+    vectordb.save_local(path)
+    write_shared_docstore(vectordb, path)
+
+
+def _worker(path, barrier, results):
+    before = _memory_mb()
+    vectordb = open_shared_index(Path(path), NoEmbeddings())
+    rng = np.random.default_rng()
+    for _ in range(5):
+        docs = vectordb.similarity_search_by_vector(rng.random(DIM, dtype=np.float32).tolist(), k=5)
+        assert len(docs) == 5
+    barrier.wait()  # measure while every worker has the index attached
+    after = _memory_mb()
+    results.put({k: after[k] - before[k] for k in after})
+    barrier.wait()
+
+
+def test_shared_docstore_round_trip(tmp_path):
+    _build_index(tmp_path)
+    docstore = MmapDocstore(tmp_path)
+    assert len(docstore) == N_VECTORS
+    doc = docstore.search("123")
+    assert doc.page_content == "Synthetic tumbler 123"
+    assert doc.metadata == {"title": "Tumbler 123", "price_rm": 123.0}
+    assert "not found" in docstore.search(str(N_VECTORS))
+
+
+def test_workers_share_index_memory(tmp_path):
+    _build_index(tmp_path)
+    index_mb = N_VECTORS * DIM * 4 / 2**20
+
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(N_WORKERS)
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_worker, args=(str(tmp_path), barrier, results)) for _ in range(N_WORKERS)]
+    for w in workers:
+        w.start()
+    deltas = [results.get(timeout=120) for _ in workers]
+    for w in workers:
+        w.join(timeout=30)
+        assert w.exitcode == 0
+
+    for d in deltas:
+        # Vectors and docstore live in the shared page cache, not in each worker's heap
+        assert d["Anonymous"] < 0.15 * index_mb, f"per-worker memory delta (MB): {deltas}"
+    assert sum(d["Pss"] for d in deltas) < 1.5 * index_mb, f"per-worker memory delta (MB): {deltas}"